@@ -1,3 +1,4 @@
+import asyncio
 from logging.config import fileConfig
 from sqlalchemy import engine_from_config, pool
 from sqlalchemy.ext.asyncio import AsyncEngine
@@ -15,6 +16,12 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 
 
+def do_run_migrations(connection):
+    context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
 async def run_migrations_online():
     connectable = AsyncEngine(
         engine_from_config(
@@ -26,8 +33,9 @@ async def run_migrations_online():
     )
 
     async with connectable.connect() as connection:
-        await connection.run_sync(context.run_migrations)
+        await connection.run_sync(do_run_migrations)
 
     await connectable.dispose()
 
-run_migrations_online()
+# Раньше корутина создавалась, но не запускалась, и миграции молча не выполнялись
+asyncio.run(run_migrations_online())
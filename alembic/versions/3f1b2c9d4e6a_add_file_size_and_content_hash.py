@@ -0,0 +1,29 @@
+"""Add file size and content hash
+
+Revision ID: 3f1b2c9d4e6a
+Revises: 7add4d70a2ba
+Create Date: 2026-10-18 10:12:41.218304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1b2c9d4e6a'
+down_revision: Union[str, None] = '7add4d70a2ba'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('files', sa.Column('size', sa.BigInteger(), nullable=True))
+    op.add_column('files', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('files') as batch_op:
+        batch_op.drop_column('content_hash')
+        batch_op.drop_column('size')
@@ -0,0 +1,33 @@
+"""Add file listing indexes
+
+Revision ID: 5c7d9e2a1b84
+Revises: b84e0d17c2f5
+Create Date: 2026-10-18 12:20:33.904156
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c7d9e2a1b84'
+down_revision: Union[str, None] = 'b84e0d17c2f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_files_owner_id_id', 'files', ['owner_id', 'id'], unique=False)
+    op.create_index('ix_files_access_granted_id', 'files', ['access_granted', 'id'], unique=False)
+    op.create_index('ix_files_upload_count_id', 'files', ['upload_count', 'id'], unique=False)
+    op.create_index('ix_files_access_granted_upload_count_id', 'files',
+                    ['access_granted', 'upload_count', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_files_access_granted_upload_count_id', table_name='files')
+    op.drop_index('ix_files_upload_count_id', table_name='files')
+    op.drop_index('ix_files_access_granted_id', table_name='files')
+    op.drop_index('ix_files_owner_id_id', table_name='files')
@@ -0,0 +1,26 @@
+"""Index file content hash
+
+Revision ID: 8e3f6a0c2d17
+Revises: 5c7d9e2a1b84
+Create Date: 2026-10-18 13:41:52.117630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e3f6a0c2d17'
+down_revision: Union[str, None] = '5c7d9e2a1b84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_files_content_hash'), 'files', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_files_content_hash'), table_name='files')
@@ -0,0 +1,29 @@
+"""Index file names in code point order on Postgres
+
+Revision ID: a6c3e9d2f184
+Revises: f2b86c1d4a57
+Create Date: 2026-10-18 21:12:37.504118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c3e9d2f184'
+down_revision: Union[str, None] = 'f2b86c1d4a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Фильтр по префиксу сравнивает filename в COLLATE "C"; в SQLite сравнение и так побайтовое
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute('CREATE INDEX IF NOT EXISTS ix_files_filename_c ON files (filename COLLATE "C")')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_files_filename_c")
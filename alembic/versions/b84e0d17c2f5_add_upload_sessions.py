@@ -0,0 +1,51 @@
+"""Add upload sessions
+
+Revision ID: b84e0d17c2f5
+Revises: 3f1b2c9d4e6a
+Create Date: 2026-10-18 11:03:09.552817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b84e0d17c2f5'
+down_revision: Union[str, None] = '3f1b2c9d4e6a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'upload_sessions',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('filename', sa.String(), nullable=True),
+        sa.Column('total_size', sa.BigInteger(), nullable=True),
+        sa.Column('chunk_size', sa.Integer(), nullable=True),
+        sa.Column('total_chunks', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('owner_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_upload_sessions_updated_at'), 'upload_sessions', ['updated_at'], unique=False)
+    op.create_table(
+        'upload_chunks',
+        sa.Column('session_id', sa.String(length=32), nullable=False),
+        sa.Column('chunk_index', sa.Integer(), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=True),
+        sa.Column('checksum', sa.String(length=64), nullable=True),
+        sa.ForeignKeyConstraint(['session_id'], ['upload_sessions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('session_id', 'chunk_index'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('upload_chunks')
+    op.drop_index(op.f('ix_upload_sessions_updated_at'), table_name='upload_sessions')
+    op.drop_table('upload_sessions')
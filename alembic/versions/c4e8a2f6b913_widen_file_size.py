@@ -0,0 +1,29 @@
+"""Widen file size to bigint
+
+Revision ID: c4e8a2f6b913
+Revises: a6c3e9d2f184
+Create Date: 2026-10-18 22:04:19.836512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a2f6b913'
+down_revision: Union[str, None] = 'a6c3e9d2f184'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Базы, созданные до того, как 3f1b2c9d4e6a стала bigint; в SQLite INTEGER и так 64-битный
+    if op.get_bind().dialect.name == "postgresql":
+        op.alter_column('files', 'size', type_=sa.BigInteger(), existing_type=sa.Integer(), existing_nullable=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.alter_column('files', 'size', type_=sa.Integer(), existing_type=sa.BigInteger(), existing_nullable=True)
@@ -0,0 +1,79 @@
+"""Add file description, tags and search index
+
+Revision ID: f2b86c1d4a57
+Revises: d1a4f7c3e920
+Create Date: 2026-10-18 18:05:44.310927
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b86c1d4a57'
+down_revision: Union[str, None] = 'd1a4f7c3e920'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Индекс поиска на момент этой ревизии; app.utils.search с тех пор меняется, поэтому DDL здесь свой
+SQLITE_INDEX_DDL = (
+    "CREATE VIRTUAL TABLE files_fts USING fts5(filename, owner, description, tags, tokenize='trigram')",
+    """CREATE TRIGGER IF NOT EXISTS files_fts_insert AFTER INSERT ON files BEGIN
+        INSERT INTO files_fts (rowid, filename, owner, description, tags)
+        VALUES (new.id, new.filename, (SELECT username FROM users WHERE id = new.owner_id),
+                new.description, new.tags);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS files_fts_update AFTER UPDATE OF filename, owner_id, description, tags ON files
+    BEGIN
+        DELETE FROM files_fts WHERE rowid = old.id;
+        INSERT INTO files_fts (rowid, filename, owner, description, tags)
+        VALUES (new.id, new.filename, (SELECT username FROM users WHERE id = new.owner_id),
+                new.description, new.tags);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS files_fts_delete AFTER DELETE ON files BEGIN
+        DELETE FROM files_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS files_fts_owner AFTER UPDATE OF username ON users BEGIN
+        UPDATE files_fts SET owner = new.username WHERE rowid IN (SELECT id FROM files WHERE owner_id = new.id);
+    END""",
+    """INSERT INTO files_fts (rowid, filename, owner, description, tags)
+       SELECT files.id, files.filename, users.username, files.description, files.tags
+       FROM files LEFT JOIN users ON users.id = files.owner_id""",
+)
+POSTGRES_INDEX_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_files_search_trgm ON files USING gin "
+    "((lower(filename || ' ' || coalesce(description, '') || ' ' || coalesce(tags, ''))) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_username_trgm ON users USING gin (lower(username) gin_trgm_ops)",
+)
+
+
+def upgrade() -> None:
+    op.add_column('files', sa.Column('description', sa.String(), nullable=True))
+    op.add_column('files', sa.Column('tags', sa.String(), nullable=True))
+    # FTS5 и триггеры на SQLite, pg_trgm GIN-индексы на Postgres; заполняется по существующим строкам
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for statement in SQLITE_INDEX_DDL:
+            op.execute(statement)
+    elif dialect == "postgresql":
+        for statement in POSTGRES_INDEX_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for trigger in ("files_fts_insert", "files_fts_update", "files_fts_delete", "files_fts_owner"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS files_fts")
+    elif dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_users_username_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_files_search_trgm")
+    with op.batch_alter_table('files') as batch_op:
+        batch_op.drop_column('tags')
+        batch_op.drop_column('description')
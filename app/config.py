@@ -1,3 +1,63 @@
+import os
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./test.db")
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 500))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+
 SECRET_KEY = "12"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 256))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", 300))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 60))
+
+UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "app/media/uploads/")
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+STORAGE_ROOT = os.getenv("STORAGE_ROOT", os.path.join(UPLOAD_FOLDER, "blobs"))
+S3_BUCKET = os.getenv("S3_BUCKET", "files")
+S3_PREFIX = os.getenv("S3_PREFIX", "blobs/")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+S3_URL_EXPIRE_SECONDS = int(os.getenv("S3_URL_EXPIRE_SECONDS", 300))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", 2 * 1024 * 1024 * 1024))
+MAX_FORM_FIELD_SIZE = int(os.getenv("MAX_FORM_FIELD_SIZE", 1024 * 1024))
+UPLOAD_SESSION_CHUNK_SIZE = int(os.getenv("UPLOAD_SESSION_CHUNK_SIZE", 8 * 1024 * 1024))
+UPLOAD_SESSION_TTL_SECONDS = int(os.getenv("UPLOAD_SESSION_TTL_SECONDS", 24 * 60 * 60))
+UPLOAD_SESSION_GC_INTERVAL_SECONDS = int(os.getenv("UPLOAD_SESSION_GC_INTERVAL_SECONDS", 15 * 60))
+DOWNLOAD_COUNTER_FLUSH_SECONDS = float(os.getenv("DOWNLOAD_COUNTER_FLUSH_SECONDS", 5))
+FILES_PAGE_SIZE = int(os.getenv("FILES_PAGE_SIZE", 50))
+FILES_MAX_PAGE_SIZE = int(os.getenv("FILES_MAX_PAGE_SIZE", 500))
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", 1024))
+COMPRESS_MAX_RATIO = float(os.getenv("COMPRESS_MAX_RATIO", 0.9))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", 6))
+FILES_BATCH_SIZE = int(os.getenv("FILES_BATCH_SIZE", 1000))
+FS_WORKERS = int(os.getenv("FS_WORKERS", 16))
+LOOP_STALL_THRESHOLD_SECONDS = float(os.getenv("LOOP_STALL_THRESHOLD_SECONDS", 0.1))
+LOOP_STALL_CHECK_INTERVAL_SECONDS = float(os.getenv("LOOP_STALL_CHECK_INTERVAL_SECONDS", 0.05))
+PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", 1000))
+PAGE_CACHE_TTL_SECONDS = float(os.getenv("PAGE_CACHE_TTL_SECONDS", 300))
+PAGE_CACHE_MAX_ENTRY_BYTES = int(os.getenv("PAGE_CACHE_MAX_ENTRY_BYTES", 512 * 1024))
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+INIT_ON_STARTUP = os.getenv("INIT_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+SHARED_STATE_BACKEND = os.getenv("SHARED_STATE_BACKEND", "memory")
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", "shared_state.db")
+SHARED_STATE_POLL_SECONDS = float(os.getenv("SHARED_STATE_POLL_SECONDS", 0.2))
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", 4))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 5))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", 1))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", 300))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 1))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 600))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", 24 * 60 * 60))
+SEARCH_RANK_LIMIT = int(os.getenv("SEARCH_RANK_LIMIT", 1000))
@@ -1,13 +1,49 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import databases
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-DATABASE_URL = "sqlite+aiosqlite:///./test.db"
+from .config import (DATABASE_URL, DB_ECHO, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+                     DB_POOL_PRE_PING, DB_STATEMENT_CACHE_SIZE, SQLITE_BUSY_TIMEOUT_MS)
+
+# Налаштування під конкретний драйвер
+url = make_url(DATABASE_URL)
+engine_options = {"echo": DB_ECHO}
+pool_options = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+if url.get_backend_name() == "postgresql":
+    engine_options.update(pool_options)
+    engine_options["connect_args"] = {"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+elif url.get_backend_name() == "sqlite":
+    # За замовчуванням aiosqlite відкриває нове з'єднання на кожен запит; тримаємо їх у пулі.
+    # База в пам'яті живе в одному з'єднанні (StaticPool), параметри пулу черги до нього не застосовні
+    if url.database not in (None, "", ":memory:"):
+        engine_options.update(pool_options, poolclass=AsyncAdaptedQueuePool)
+else:
+    engine_options.update(pool_options)
+
+engine = create_async_engine(DATABASE_URL, **engine_options)
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    if engine.dialect.name != "sqlite":
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
 
-# Підключення до бази даних
-database = databases.Database(DATABASE_URL)
-engine = create_async_engine(DATABASE_URL, echo=True)
 
 # Налаштування сесії
 SessionLocal = sessionmaker(
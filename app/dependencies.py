@@ -1,4 +1,5 @@
 import os
+import time
 from datetime import datetime, timedelta
 
 from starlette.responses import RedirectResponse
@@ -8,29 +9,54 @@ from .database import SessionLocal
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from .config import (SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL_SECONDS,
+                     USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS)
 from .models import User
+from .schemas import UserOut
+from .utils.cache import TTLCache
+from .utils.passwords import password_hasher
+from .utils.shared_state import shared_state
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 templates = Jinja2Templates(directory=os.path.join(os.path.dirname(__file__), "templates"))
 
+# token -> username из проверенного JWT; username -> UserOut без связей
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+
 
 async def get_db():
     async with SessionLocal() as session:
         yield session
 
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def get_password_hash(password: str) -> str:
+    return await password_hasher.hash(password)
+
 
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> User | None:
+    """Check the password and transparently rehash it when the bcrypt cost has changed."""
+    user = await get_user(db, username=username)
+    # Возвращаем соединение в пул, пока bcrypt считает хеш
+    await db.commit()
+    if not user:
+        return None
+    verified, new_hash = await password_hasher.verify_and_update(password, user.password)
+    if not verified:
+        return None
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
+    return user
 
 
 def create_access_token(data: dict):
@@ -50,20 +76,86 @@ async def get_user(db: AsyncSession, id: int = None, username: str = None) -> Us
         return result.scalars().first()
 
 
+def decode_token(token: str) -> str | None:
+    username = token_cache.get(token)
+    if username is not None:
+        return username
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    username = payload.get("username")
+    if username is None:
+        return None
+    # Запись не должна пережить сам токен
+    token_cache.set(token, username, ttl=payload["exp"] - time.time() if "exp" in payload else None)
+    return username
+
+
+# Растёт при каждой инвалидации: чтение, начатое до неё, не должно вернуть старую строку в кэш
+_user_invalidations = 0
+
+
+async def get_user_projection(db: AsyncSession, username: str) -> UserOut | None:
+    user = user_cache.get(username)
+    if user is not None:
+        return user
+    invalidations = _user_invalidations
+    result = await db.execute(select(User.id, User.username, User.is_admin).filter(User.username == username))
+    row = result.first()
+    if row is None:
+        return None
+    user = UserOut.model_validate(row)
+    if invalidations == _user_invalidations:
+        user_cache.set(username, user)
+    return user
+
+
+def _drop_cached_user(username: str) -> None:
+    global _user_invalidations
+    _user_invalidations += 1
+    user_cache.pop(username)
+
+
+def invalidate_user(username: str) -> None:
+    _drop_cached_user(username)
+    shared_state.publish("user", username)
+
+
+shared_state.subscribe("user", _drop_cached_user)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _collect_changed_user(mapper, connection, target: User) -> None:
+    # Срабатывает для изменений через ORM во время flush; массовые UPDATE/DELETE должны вызывать invalidate_user
+    # сами. Сбрасывать кэш здесь рано: до коммита параллельный запрос ещё прочитает и закэширует старую строку
+    usernames = object_session(target).info.setdefault("changed_users", set())
+    usernames.add(target.username)
+    usernames.update(inspect(target).attrs.username.history.deleted)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session) -> None:
+    for username in session.info.pop("changed_users", ()):
+        invalidate_user(username)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session: Session) -> None:
+    session.info.pop("changed_users", None)
+
+
 async def get_current_user(request: Request, db: AsyncSession = Depends(get_db)):
     token = request.cookies.get("access_token")
     if not token:
         return False
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("username")
-        if username is None:
-            return False
-    except JWTError:
+    username = decode_token(token)
+    if username is None:
         return False
 
-    user = await get_user(db=db, username=username)
+    user = await get_user_projection(db, username)
 
     if not user:
         raise HTTPException(
@@ -1,26 +1,74 @@
 from fastapi import FastAPI, Request, Depends
-from app.dependencies import templates
-from fastapi.staticfiles import StaticFiles
 from fastapi.responses import RedirectResponse
 import os
-from .database import engine, Base, database
-from .routes import auth, files, admin
+from .database import engine, Base
+from .routes import auth, files, admin, metrics
 from .models import User
 from .dependencies import get_current_user
+from .config import MAX_UPLOAD_SIZE, METRICS_ENABLED, INIT_ON_STARTUP
+from .utils.compression import PrecompressedStaticFiles, precompress_directory
+from .utils.counters import download_counter
+from .utils.fs import fs
+from .utils.jobs import job_queue
+from .utils.instrumentation import MetricsMiddleware, instrument_engine
+from .utils.loop_monitor import loop_stall_detector
+from .utils.page_cache import render_page
+from .utils.search import create_search_index
+from .utils.shared_state import shared_state
+from .utils.uploads import RequestSizeLimitMiddleware, start_upload_gc, stop_upload_gc
 
 
 async def init_db():
+    # Под app.serve схему и статику готовит родительский процесс, один раз на все воркеры
+    if not INIT_ON_STARTUP:
+        return
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_search_index)
 
 
-app = FastAPI(on_startup=[init_db, database.connect], on_shutdown=[database.disconnect])
-app.mount("/static", StaticFiles(directory=os.path.join(os.path.dirname(__file__), "static")), name="static")
+async def recover_jobs():
+    # Задачи, оставшиеся running после падения процесса; под app.serve это делает родитель
+    if INIT_ON_STARTUP:
+        await job_queue.recover()
+
+
+async def precompress_static():
+    if not INIT_ON_STARTUP:
+        return
+    await fs.run("compress", precompress_directory, STATIC_DIR)
+
+
+async def close_db():
+    await engine.dispose()
+
+
+app = FastAPI(on_startup=[init_db, recover_jobs, precompress_static, shared_state.start, start_upload_gc,
+                          download_counter.start, job_queue.start, loop_stall_detector.start],
+              on_shutdown=[loop_stall_detector.stop, job_queue.stop, download_counter.stop, stop_upload_gc,
+                           shared_state.stop, close_db])
+
+
+# Відхиляємо завеликі запити до того, як тіло буде прочитане. Чистий ASGI, а не @app.middleware("http"):
+# BaseHTTPMiddleware пропускає лише http.response.body і ламає pathsend/zerocopysend
+app.add_middleware(RequestSizeLimitMiddleware, max_size=MAX_UPLOAD_SIZE)
+
+
+if METRICS_ENABLED:
+    # Додається останнім, тож стоїть зовні й бачить також відповіді 413
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine)
+
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+app.mount("/static", PrecompressedStaticFiles(directory=STATIC_DIR), name="static")
 
 
 app.include_router(auth.router)
 app.include_router(files.router)
 app.include_router(admin.router)
+if METRICS_ENABLED:
+    app.include_router(metrics.router)
 
 
 @app.get("/")
@@ -28,5 +76,4 @@ async def read_root(request: Request, user: User = Depends(get_current_user)):
     token = request.cookies.get("access_token")
     if not token:
         return RedirectResponse(url="/login")
-    contex = {"request": request, "user": user}
-    return templates.TemplateResponse("index.html", contex)
+    return render_page(request, "index.html", {"user": user}, bool(user), bool(user and user.is_admin))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, Boolean, DateTime, Index, JSON
 from sqlalchemy.orm import relationship
 from .database import Base
 import datetime
@@ -11,7 +11,7 @@ class User(Base):
     password = Column(String)
     is_admin = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
-    files = relationship('File', back_populates='owner', lazy="selectin")
+    files = relationship('File', back_populates='owner', lazy="raise")
 
 
 class File(Base):
@@ -21,5 +21,67 @@ class File(Base):
     path = Column(String)
     upload_count = Column(Integer, default=0)
     access_granted = Column(Boolean, default=False)
+    size = Column(BigInteger, nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)
+    # processing -> ready | failed; обработку после загрузки делают фоновые задачи
+    status = Column(String(16), default="ready", server_default="ready", nullable=False)
+    description = Column(String, nullable=True)
+    # Теги через запятую, в нижнем регистре
+    tags = Column(String, nullable=True)
     owner_id = Column(Integer, ForeignKey('users.id'))
-    owner = relationship('User', back_populates='files', lazy="selectin")
+    owner = relationship('User', back_populates='files', lazy="raise")
+
+    # Индексы под keyset-пагинацию и фильтры списков файлов
+    __table_args__ = (
+        Index('ix_files_owner_id_id', 'owner_id', 'id'),
+        Index('ix_files_access_granted_id', 'access_granted', 'id'),
+        Index('ix_files_upload_count_id', 'upload_count', 'id'),
+        Index('ix_files_access_granted_upload_count_id', 'access_granted', 'upload_count', 'id'),
+    )
+
+
+class UploadSession(Base):
+    __tablename__ = 'upload_sessions'
+    id = Column(String(32), primary_key=True)
+    filename = Column(String)
+    total_size = Column(BigInteger)
+    chunk_size = Column(Integer)
+    total_chunks = Column(Integer)
+    status = Column(String, default="open")
+    owner_id = Column(Integer, ForeignKey('users.id'))
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    chunks = relationship('UploadChunk', back_populates='session', lazy="selectin",
+                          cascade="all, delete-orphan", passive_deletes=True)
+
+
+class UploadChunk(Base):
+    __tablename__ = 'upload_chunks'
+    session_id = Column(String(32), ForeignKey('upload_sessions.id', ondelete="CASCADE"), primary_key=True)
+    chunk_index = Column(Integer, primary_key=True)
+    size = Column(Integer)
+    checksum = Column(String(64))
+    session = relationship('UploadSession', back_populates='chunks')
+
+
+class Job(Base):
+    __tablename__ = 'jobs'
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(64), nullable=False)
+    payload = Column(JSON, nullable=True)
+    # [waiting ->] pending -> running -> done | failed; после сбоя снова pending до max_attempts
+    status = Column(String(16), default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, nullable=False)
+    run_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    locked_by = Column(String(64), nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
+    file_id = Column(Integer, ForeignKey('files.id', ondelete="CASCADE"), nullable=True, index=True)
+    file = relationship('File', lazy="raise")
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
@@ -1,3 +1,64 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.dependencies import get_current_user, get_db, token_cache, user_cache
+from app.models import User
+from app.utils.counters import download_counter
+from app.utils.fs import fs
+from app.utils.jobs import job_queue
+from app.utils.loop_monitor import loop_stall_detector
+from app.utils.page_cache import page_cache
+from app.utils.passwords import password_hasher
+from app.utils.shared_state import shared_state
 
 router = APIRouter()
+
+
+@router.get("/admin/download-counter")
+async def download_counter_stats(user: User = Depends(get_current_user)):
+    if not user or not user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can see counter stats")
+    return download_counter.stats()
+
+
+@router.get("/admin/auth-cache")
+async def auth_cache_stats(user: User = Depends(get_current_user)):
+    if not user or not user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can see cache stats")
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
+
+
+@router.get("/admin/password-hasher")
+async def password_hasher_stats(user: User = Depends(get_current_user)):
+    if not user or not user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can see hasher stats")
+    return password_hasher.stats()
+
+
+@router.get("/admin/filesystem")
+async def filesystem_stats(user: User = Depends(get_current_user)):
+    if not user or not user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can see filesystem stats")
+    return {"filesystem": fs.stats(), "event_loop": loop_stall_detector.stats()}
+
+
+@router.get("/admin/page-cache")
+async def page_cache_stats(user: User = Depends(get_current_user)):
+    if not user or not user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can see cache stats")
+    return page_cache.stats()
+
+
+@router.get("/admin/shared-state")
+async def shared_state_stats(user: User = Depends(get_current_user)):
+    if not user or not user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can see shared state stats")
+    return shared_state.stats()
+
+
+@router.get("/admin/jobs")
+async def job_stats(user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    if not user or not user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can see job stats")
+    return await job_queue.stats(db)
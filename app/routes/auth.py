@@ -6,7 +6,8 @@ from fastapi.responses import RedirectResponse, HTMLResponse
 from app.dependencies import templates
 from starlette.status import HTTP_302_FOUND
 from app.models import User
-from app.dependencies import get_password_hash, verify_password, create_access_token, get_db, get_current_user, get_user
+from app.dependencies import get_password_hash, authenticate_user, create_access_token, get_db, get_current_user
+from app.utils.page_cache import render_page
 
 
 router = APIRouter()
@@ -25,11 +26,11 @@ async def register(
     db: AsyncSession = Depends(get_db)
 ):
 
-    existing_user = await db.execute(select(User).where(User.username == username))
+    existing_user = await db.execute(select(User.id).where(User.username == username))
     if existing_user.scalar():
         raise HTTPException(status_code=400, detail="Username already exists")
 
-    hashed_password = get_password_hash(password)
+    hashed_password = await get_password_hash(password)
     new_user = User(username=username, password=hashed_password)
     db.add(new_user)
     await db.commit()
@@ -39,11 +40,9 @@ async def register(
 
 @router.post("/token")
 async def token(request: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
-    user = await get_user(db, username=request.username)
+    user = await authenticate_user(db, request.username, request.password)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalid credentials")
-    if not verify_password(request.password, user.password):
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalid credentials")
     access_token = create_access_token(data={"username": user.username})
     return {"access_token": access_token,
             "token_type": "bearer",
@@ -62,8 +61,8 @@ async def login(
         form_data: OAuth2PasswordRequestForm = Depends(),
         db: AsyncSession = Depends(get_db)
 ):
-    user = await get_user(db, username=form_data.username)
-    if not user or not verify_password(form_data.password, user.password):
+    user = await authenticate_user(db, form_data.username, form_data.password)
+    if not user:
         error_message = "Invalid username or password"
         return templates.TemplateResponse("login.html", {"request": request, "error_message": error_message})
 
@@ -86,5 +85,4 @@ async def user_profile(request: Request, user: User = Depends(get_current_user))
     if not user:
         return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
 
-    context = {"request": request, "user": user}
-    return templates.TemplateResponse("profile.html", context)
+    return render_page(request, "profile.html", {"user": user}, user.id, user.username, user.is_admin)
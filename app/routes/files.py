@@ -1,70 +1,471 @@
+import asyncio
+import datetime
+import math
 import os
+import time
+import uuid
+from collections import Counter
+from dataclasses import astuple, dataclass
 from app.dependencies import templates
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, status, Request, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Request, Query
 from fastapi.encoders import jsonable_encoder
+from markupsafe import Markup
+from sqlalchemy import delete, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi.responses import FileResponse
-from app.models import File, User
+from app.database import SessionLocal
+from app.models import File, Job, User, UploadSession, UploadChunk
 from app.dependencies import get_db, get_current_user, oauth2_scheme
-from starlette.responses import HTMLResponse, RedirectResponse
-from app.schemas import FileOut
+from starlette.responses import HTMLResponse, RedirectResponse, JSONResponse, Response
+from app.config import (MAX_UPLOAD_SIZE, UPLOAD_SESSION_CHUNK_SIZE, FILES_PAGE_SIZE, FILES_MAX_PAGE_SIZE,
+                        FILES_BATCH_SIZE, SEARCH_RANK_LIMIT)
+from app.schemas import FileOut, FileBatch, FileBatchAccess, UploadSessionCreate
+from app.utils.compression import accepts_encoding, is_compressible
+from app.utils.counters import download_counter
+from app.utils.downloads import DownloadResponse
+from app.utils.fs import fs
+from app.utils.jobs import job_queue
+from app.utils.page_cache import page_cache, is_fresh, cached_response
+from app.utils.pagination import (SORT_OPTIONS, keyset_paginate, next_cursor, prefix_conditions, encode_cursor,
+                                  decode_cursor)
+from app.utils.search import SEARCH_MODES, MIN_TERM_LENGTH, apply_search, count_matches, search_terms
+from app.utils.shared_state import shared_state
+from app.utils.storage import lock_references, storage
+from app.utils.uploads import (StagedUpload, stage_multipart, commit_upload, discard_upload, stage_chunk, chunk_path,
+                               expected_chunk_size, assemble_session, remove_session_dir)
 router = APIRouter()
 
-UPLOAD_FOLDER = 'app/static/uploads/'
-
 
 @router.get("/upload", response_class=HTMLResponse)
 async def read_upload(request: Request, user: User = Depends(get_current_user)):
     return templates.TemplateResponse("upload.html", {"request": request, "user": user})
 
 
-@router.post("/upload", response_class=HTMLResponse)
+def multipart_body(required: list[str], **properties: dict) -> dict:
+    # Тело разбирается в обработчике, поэтому схему формы для OpenAPI приходится описать вручную
+    return {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object", "properties": properties, "required": required}}}}}
+
+
+@router.post("/upload", response_class=HTMLResponse,
+             openapi_extra=multipart_body(["uploaded_file"],
+                                          uploaded_file={"type": "string", "format": "binary"},
+                                          description={"type": "string"},
+                                          tags={"type": "string", "description": "Comma-separated"}))
 async def upload_file(request: Request,
-                      uploaded_file: UploadFile = Form(...),
                       db: AsyncSession = Depends(get_db),
                       user: User = Depends(get_current_user)):
     if not user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can upload files")
 
+    # Тело читается потоком: файл сразу пишется во временный файл, лимит размера проверяется по ходу
+    form = await stage_multipart(request)
+    uploads = form.files_of("uploaded_file")
+    # Браузер без выбранного файла присылает часть с пустым именем
+    if len(uploads) != 1 or not uploads[0][0]:
+        await form.discard()
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail="Exactly one uploaded_file is required")
+    filename, staged = uploads[0]
+    await form.discard(keep=[staged])
+    filename = os.path.basename(filename)
+
     # Проверка существования файла
-    result = await db.execute(select(File).filter(File.filename == uploaded_file.filename))
+    result = await db.execute(select(File).filter(File.filename == filename))
     existing_file = result.scalar_one_or_none()
     if existing_file:
+        await discard_upload(staged)
         error_message = "File with this name already exists in the database"
         return templates.TemplateResponse("upload.html", {"request": request, "error_message": error_message})
 
-    # Сохранение файла
-    file_path = f"app/media/uploads/{uploaded_file.filename}"
-    with open(file_path, "wb") as f:
-        f.write(await uploaded_file.read())
-
-    new_file = File(filename=uploaded_file.filename, path=file_path, owner_id=user.id)
-    db.add(new_file)
-    await db.commit()
-    await db.refresh(new_file)
+    # Сохранение файла: в хранилище только после коммита
+    description, tags = form.fields.get("description"), form.fields.get("tags")
+    await store_file(db, staged, filename, user.id,
+                     description=description or None, tags=normalize_tags(tags.split(",")) if tags else None)
 
     response = RedirectResponse(url="/files", status_code=status.HTTP_302_FOUND)
     return response
 
 
+def normalize_tags(tags: list[str]) -> str | None:
+    tags = [tag.strip().lower() for tag in tags if tag.strip()]
+    return ",".join(dict.fromkeys(tags)) or None
+
+
+async def store_file(db: AsyncSession, staged: StagedUpload, filename: str, owner_id: int,
+                     description: str | None = None, tags: str | None = None) -> File:
+    """Commit a File row for a staged upload and move the bytes into content-addressed storage.
+
+    Identical content is stored once: if the blob already exists the staged copy is dropped.
+    Everything after that (compressed variants) is left to a ``process_file`` job, held
+    until the blob is stored, so the file is returned in status ``processing``.
+    """
+    new_file = File(filename=filename, path=storage.location(staged.content_hash), owner_id=owner_id,
+                    size=staged.size, content_hash=staged.content_hash, status="processing",
+                    description=description, tags=tags)
+    async with storage.lock(staged.content_hash):
+        db.add(new_file)
+        job = job_queue.enqueue(db, "process_file", new_file, hold=True)
+        try:
+            await lock_references(db, [staged.content_hash])
+            await db.commit()
+        except Exception:
+            await discard_upload(staged)
+            raise
+        try:
+            await storage.put(staged)
+        except Exception:
+            await discard_upload(staged)
+            await db.delete(new_file)
+            await db.commit()
+            page_cache.bump()
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not store file")
+        await job_queue.release(db, [job])
+        await db.commit()
+    job_queue.notify()
+    page_cache.bump()
+    shared_state.incr("files_uploaded")
+    return new_file
+
+
+async def store_files(db: AsyncSession, uploads: list[tuple[StagedUpload, str]],
+                      owner_id: int) -> tuple[list[File], set[str]]:
+    """Batch version of ``store_file``: all rows in one transaction, blobs moved into storage concurrently.
+
+    Returns the new rows and the hashes whose blobs could not be stored; rows for those are removed again.
+    """
+    new_files = [File(filename=filename, path=storage.location(staged.content_hash), owner_id=owner_id,
+                      size=staged.size, content_hash=staged.content_hash, status="processing")
+                 for staged, filename in uploads]
+    async with storage.lock_many(staged.content_hash for staged, _ in uploads):
+        db.add_all(new_files)
+        jobs = [job_queue.enqueue(db, "process_file", new_file, hold=True) for new_file in new_files]
+        try:
+            await lock_references(db, (staged.content_hash for staged, _ in uploads))
+            await db.commit()
+        except Exception:
+            await asyncio.gather(*(discard_upload(staged) for staged, _ in uploads))
+            raise
+        # Одинаковое содержимое внутри пачки кладём в хранилище один раз
+        unique = {}
+        for staged, filename in uploads:
+            unique.setdefault(staged.content_hash, (staged, filename))
+        await asyncio.gather(*(discard_upload(staged) for staged, _ in uploads
+                               if unique[staged.content_hash][0] is not staged))
+        results = await asyncio.gather(*(storage.put(staged) for staged, _ in unique.values()),
+                                       return_exceptions=True)
+        failed = {content_hash for content_hash, result in zip(unique, results) if isinstance(result, Exception)}
+        if failed:
+            await asyncio.gather(*(discard_upload(unique[content_hash][0]) for content_hash in failed))
+            await db.execute(delete(File).where(File.id.in_([file.id for file in new_files
+                                                             if file.content_hash in failed])))
+        await job_queue.release(db, [job for job, file in zip(jobs, new_files) if file.content_hash not in failed])
+        await db.commit()
+    job_queue.notify()
+    page_cache.bump()
+    shared_state.incr("files_uploaded", len(new_files) - sum(file.content_hash in failed for file in new_files))
+    return new_files, failed
+
+
+async def process_file(db: AsyncSession, job: Job) -> None:
+    """Post-upload work for one file; the upload request has returned by now."""
+    file = await db.get(File, job.file_id)
+    if file is None:
+        return
+    # Задача отпускается после записи блоба; сюда попадает только задача упавшего воркера
+    if file.content_hash and not await storage.exists(file.content_hash):
+        raise RuntimeError("Blob is not in storage yet")
+    if file.content_hash:
+        await storage.create_variants(file.content_hash, file.filename)
+    file.status = "ready"
+    await db.commit()
+    page_cache.bump()
+
+
+async def process_file_failed(db: AsyncSession, job: Job) -> None:
+    await db.execute(update(File).where(File.id == job.file_id).values(status="failed"))
+    await db.commit()
+    page_cache.bump()
+
+
+job_queue.register("process_file", process_file, on_failure=process_file_failed)
+
+
+async def release_blobs(files: list[tuple[str | None, str]]) -> None:
+    """Remove blobs behind deleted files once no row references their content.
+
+    ``files`` are ``(content_hash, path)`` pairs of rows that are already deleted and committed.
+    Uses its own session, so it can run as a background task after the response.
+    """
+    # Файлы, загруженные до появления хранилища по хешу
+    await asyncio.gather(*(fs.remove(path, missing_ok=True) for content_hash, path in files if not content_hash))
+    hashes = sorted({content_hash for content_hash, _ in files if content_hash})
+    for i in range(0, len(hashes), FILES_BATCH_SIZE):
+        batch = hashes[i:i + FILES_BATCH_SIZE]
+        async with storage.lock_many(batch):
+            async with SessionLocal() as db:
+                # Другой воркер не закоммитит новую ссылку на эти блобы, пока они не удалены
+                await lock_references(db, batch)
+                result = await db.execute(select(File.content_hash).distinct()
+                                          .where(File.content_hash.in_(batch)))
+                referenced = set(result.scalars())
+                await asyncio.gather(*(storage.delete(content_hash) for content_hash in batch
+                                       if content_hash not in referenced))
+                await db.commit()
+
+
+def session_out(session: UploadSession) -> dict:
+    return {"upload_id": session.id,
+            "filename": session.filename,
+            "total_size": session.total_size,
+            "chunk_size": session.chunk_size,
+            "total_chunks": session.total_chunks,
+            "status": session.status,
+            "received_chunks": sorted(chunk.chunk_index for chunk in session.chunks)}
+
+
+async def get_upload_session(db: AsyncSession, upload_id: str, user: User) -> UploadSession:
+    result = await db.execute(select(UploadSession).filter(UploadSession.id == upload_id))
+    session = result.scalar_one_or_none()
+    if not session or session.owner_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload session not found")
+    return session
+
+
+@router.post("/uploads", status_code=status.HTTP_201_CREATED)
+async def create_upload_session(request: UploadSessionCreate,
+                                db: AsyncSession = Depends(get_db),
+                                user: User = Depends(get_current_user)):
+    if not user or not user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can upload files")
+    if request.total_size < 0 or request.total_size > MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File is too large")
+    chunk_size = request.chunk_size or UPLOAD_SESSION_CHUNK_SIZE
+    if chunk_size <= 0 or chunk_size > UPLOAD_SESSION_CHUNK_SIZE:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"chunk_size must be between 1 and {UPLOAD_SESSION_CHUNK_SIZE}")
+
+    filename = os.path.basename(request.filename)
+    result = await db.execute(select(File.id).filter(File.filename == filename))
+    if result.scalar_one_or_none():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail="File with this name already exists in the database")
+
+    session = UploadSession(id=uuid.uuid4().hex, filename=filename, total_size=request.total_size,
+                            chunk_size=chunk_size, total_chunks=max(1, math.ceil(request.total_size / chunk_size)),
+                            owner_id=user.id, chunks=[])
+    db.add(session)
+    await db.commit()
+    return session_out(session)
+
+
+@router.get("/uploads/{upload_id}")
+async def read_upload_session(upload_id: str,
+                              db: AsyncSession = Depends(get_db),
+                              user: User = Depends(get_current_user)):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    return session_out(await get_upload_session(db, upload_id, user))
+
+
+@router.put("/uploads/{upload_id}/chunks/{chunk_index}")
+async def upload_chunk(upload_id: str,
+                       chunk_index: int,
+                       request: Request,
+                       db: AsyncSession = Depends(get_db),
+                       user: User = Depends(get_current_user)):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    session = await get_upload_session(db, upload_id, user)
+    if session.status != "open":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload session is not open")
+    if not 0 <= chunk_index < session.total_chunks:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Chunk index out of range")
+    # Сессия больше не нужна в транзакции, пока идёт приём байтов
+    await db.commit()
+
+    staged = await stage_chunk(session, chunk_index, request.stream())
+    expected_checksum = request.headers.get("x-chunk-sha256")
+    if staged.size != expected_chunk_size(session, chunk_index) or \
+            (expected_checksum and expected_checksum.lower() != staged.content_hash):
+        await discard_upload(staged)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Chunk size or checksum mismatch")
+    await commit_upload(staged, chunk_path(session.id, chunk_index))
+
+    # Повтор того же чанка параллельно с первой попыткой: одна строка, выигрывает последняя запись
+    insert = postgresql_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    statement = insert(UploadChunk).values(session_id=session.id, chunk_index=chunk_index,
+                                           size=staged.size, checksum=staged.content_hash)
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[UploadChunk.session_id, UploadChunk.chunk_index],
+        set_={"size": statement.excluded.size, "checksum": statement.excluded.checksum}))
+    await db.execute(update(UploadSession)
+                     .where(UploadSession.id == session.id)
+                     .values(updated_at=datetime.datetime.utcnow()))
+    await db.commit()
+    return {"upload_id": session.id, "chunk_index": chunk_index,
+            "size": staged.size, "checksum": staged.content_hash}
+
+
+async def reopen_upload_session(db: AsyncSession, upload_id: str) -> None:
+    """Return a session that failed to complete to ``open``, so the client can retry without re-sending chunks."""
+    await db.rollback()
+    result = await db.execute(update(UploadSession)
+                              .where(UploadSession.id == upload_id, UploadSession.status == "assembling")
+                              .values(status="open", updated_at=datetime.datetime.utcnow()))
+    await db.commit()
+    if result.rowcount != 1:
+        # Сессию уже удалил закоммиченный store_file, чанки больше не нужны
+        await remove_session_dir(upload_id)
+
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_upload_session(upload_id: str,
+                                  db: AsyncSession = Depends(get_db),
+                                  user: User = Depends(get_current_user)):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    session = await get_upload_session(db, upload_id, user)
+    missing = sorted(set(range(session.total_chunks)) - {chunk.chunk_index for chunk in session.chunks})
+    if missing:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail={"message": "Upload is incomplete", "missing_chunks": missing})
+
+    # Только один запрос может собрать файл
+    result = await db.execute(update(UploadSession)
+                              .where(UploadSession.id == session.id, UploadSession.status == "open")
+                              .values(status="assembling", updated_at=datetime.datetime.utcnow()))
+    await db.commit()
+    if result.rowcount != 1:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload session is not open")
+
+    try:
+        staged = await assemble_session(session)
+        if staged.size != session.total_size:
+            await discard_upload(staged)
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Assembled size mismatch")
+
+        await db.delete(session)
+        new_file = await store_file(db, staged, session.filename, user.id)
+    except Exception as exc:
+        await reopen_upload_session(db, upload_id)
+        if isinstance(exc, IntegrityError):
+            # Имя заняли, пока шла загрузка: другая сессия или обычная загрузка
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                detail="File with this name already exists in the database") from exc
+        raise
+    await remove_session_dir(upload_id)
+    return {"id": new_file.id, "filename": new_file.filename,
+            "size": new_file.size, "content_hash": new_file.content_hash, "status": new_file.status}
+
+
+@router.delete("/uploads/{upload_id}")
+async def abort_upload_session(upload_id: str,
+                               db: AsyncSession = Depends(get_db),
+                               user: User = Depends(get_current_user)):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    session = await get_upload_session(db, upload_id, user)
+    await db.delete(session)
+    await db.commit()
+    await remove_session_dir(upload_id)
+    return {"message": "Upload session aborted"}
+
+
+def file_listing_query():
+    # Только отображаемые колонки, владелец через один JOIN
+    return (select(File.id,
+                   File.filename,
+                   File.upload_count,
+                   File.access_granted,
+                   File.status,
+                   User.username.label("owner_id"))
+            .outerjoin(User, File.owner_id == User.id))
+
+
+@dataclass
+class FileListParams:
+    cursor: str | None = Query(None, description="Opaque cursor from the previous page")
+    limit: int = Query(FILES_PAGE_SIZE, ge=1, le=FILES_MAX_PAGE_SIZE)
+    prefix: str | None = Query(None, description="Filename prefix")
+    owner: str | None = Query(None, description="Owner username")
+    access: str | None = Query(None, pattern="^(true|false)?$", description="Filter by access_granted")
+    sort: str = Query("id", description=f"One of {', '.join(SORT_OPTIONS)}")
+    format: str = Query("html", pattern="^(html|json)$")
+
+
+def file_conditions(prefix: str | None = None, owner: str | None = None,
+                    access_granted: bool | None = None) -> list:
+    """WHERE clauses for the file filters; they only touch ``files``, so they fit SELECT, UPDATE and DELETE."""
+    conditions = []
+    if prefix:
+        conditions.extend(prefix_conditions(File.filename, prefix))
+    if owner:
+        conditions.append(File.owner_id == select(User.id).where(User.username == owner).scalar_subquery())
+    if access_granted is not None:
+        conditions.append(File.access_granted == access_granted)
+    return conditions
+
+
+async def list_files(db: AsyncSession, params: FileListParams, query=None) -> tuple[list[dict], str | None]:
+    query = file_listing_query() if query is None else query
+    access_granted = params.access == "true" if params.access else None
+    query = query.where(*file_conditions(params.prefix, params.owner, access_granted))
+    query, key_names = keyset_paginate(query, File, params.sort, params.cursor, params.limit)
+    result = await db.execute(query)
+    files = [row._asdict() for row in result]
+    return files[:params.limit], next_cursor(files, key_names, params.limit)
+
+
+async def render_file_table(request: Request, db: AsyncSession, template: str, is_admin: bool,
+                            params: FileListParams, query=None) -> str:
+    # Таблица одинакова для всех зрителей с теми же параметрами и правами
+    key = page_cache.listing_key(template, is_admin, *astuple(params))
+    table = page_cache.get(key)
+    if table is None:
+        files, cursor = await list_files(db, params, query)
+        # Относительная ссылка: фрагмент общий для всех хостов и схем
+        next_url = "?" + request.url.include_query_params(cursor=cursor).query if cursor else None
+        context = {"files": files, "user": {"is_admin": is_admin}, "next_url": next_url}
+        table = templates.get_template(template).render(context)
+        page_cache.set(key, table)
+    return table
+
+
+async def render_file_list(request: Request, db: AsyncSession, template: str, table_template: str, user: User,
+                           params: FileListParams, query=None) -> Response:
+    """A listing page from the page cache: 304 by ETag, a cached page, or a page around a cached table."""
+    is_admin = bool(user and user.is_admin)
+    key = page_cache.listing_key(template, bool(user), is_admin, *astuple(params))
+    etag = page_cache.etag(key)
+    if is_fresh(request.headers, etag):
+        return cached_response(None, etag)
+    media_type = "application/json" if params.format == "json" else "text/html"
+    body = page_cache.get(key)
+    if body is None:
+        if params.format == "json":
+            files, cursor = await list_files(db, params, query)
+            body = JSONResponse({"items": files, "next_cursor": cursor}).body
+        else:
+            table = await render_file_table(request, db, table_template, is_admin, params, query)
+            context = {"request": request, "user": user, "params": params, "table": Markup(table)}
+            body = templates.get_template(template).render(context).encode()
+        page_cache.set(key, body)
+    return cached_response(body, etag, media_type)
+
+
 @router.get("/files")
 async def get_files(request: Request,
+                    params: FileListParams = Depends(),
                     user: User = Depends(get_current_user),
                     db: AsyncSession = Depends(get_db)):
     if not user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can see all files")
 
-    result = await db.execute(select(File))
-    files_db = result.scalars().all()
-    files = [{"id": file.id,
-              "filename": file.filename,
-              "path": file.path,
-              "upload_count": file.upload_count,
-              "access_granted": file.access_granted,
-              "owner_id": file.owner.username} for file in files_db]
-    context = {"request": request, "files": files, "user": user}
-    return templates.TemplateResponse("files.html", context)
+    return await render_file_list(request, db, "files.html", "files_table.html", user, params)
 
 
 @router.put("/files/{id}")
@@ -79,32 +480,100 @@ async def update_file(id: int, request: FileOut, user: User = Depends(get_curren
     if not file:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
 
-    # Обновление данных
-    file.access_granted = request.access_granted
+    # Обновление данных: только переданные поля
+    if request.access_granted is not None:
+        file.access_granted = request.access_granted
+    if "description" in request.model_fields_set:
+        file.description = request.description or None
+    if request.tags is not None:
+        file.tags = normalize_tags(request.tags)
     await db.commit()
+    page_cache.bump()
 
     return {"message": "File updated successfully"}
 
 
 @router.get("/files/users")
 async def get_files(request: Request,
+                    params: FileListParams = Depends(),
                     user: User = Depends(get_current_user),
                     db: AsyncSession = Depends(get_db)):
 
-    result = await db.execute(select(File).where(File.access_granted == True))
-    files_db = result.scalars().fetchall()
-    files = [{"id": file.id,
-              "filename": file.filename,
-              "path": file.path,
-              "upload_count": file.upload_count,
-              "access_granted": file.access_granted,
-              "owner_id": file.owner.username} for file in files_db if file.access_granted is True]
-    context = {"request": request, "files": files, "user": user}
-    return templates.TemplateResponse("files_users.html", context)
+    params.access = None
+    return await render_file_list(request, db, "files_users.html", "files_users_table.html", user, params,
+                                  file_listing_query().where(File.access_granted == True))
+
+
+@dataclass
+class FileSearchParams:
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find in name, owner, description, tags")
+    fuzzy: bool = Query(True, description="Fall back to typo-tolerant matching when nothing matches exactly")
+    cursor: str | None = Query(None, description="Opaque cursor from the previous page")
+    limit: int = Query(FILES_PAGE_SIZE, ge=1, le=FILES_MAX_PAGE_SIZE)
+
+
+async def search_files(db: AsyncSession, params: FileSearchParams, is_admin: bool) -> dict:
+    if params.cursor:
+        values = decode_cursor(params.cursor)
+        if len(values) < 3 or values[0] not in SEARCH_MODES:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        mode, ranked, after = values[0], bool(values[1]), values[2:]
+    else:
+        has_terms = any(len(term) >= MIN_TERM_LENGTH for term in search_terms(params.q))
+        mode, ranked, after = ("exact" if has_terms else "prefix"), None, None
+
+    while True:
+        # Ранжировать всё подряд на миллионах совпадений дорого: слишком общий запрос отдаём по id
+        if ranked is None:
+            ranked = mode != "prefix" and \
+                await count_matches(db, params.q, mode, SEARCH_RANK_LIMIT) <= SEARCH_RANK_LIMIT
+        query = file_listing_query().add_columns(File.description, File.tags)
+        if not is_admin:
+            query = query.where(File.access_granted == True)
+        query, keys = apply_search(query, db.bind.dialect.name, params.q, mode, ranked)
+        if after is not None:
+            if len(after) != len(keys):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+            query = query.where(tuple_(*keys) > tuple_(*after) if len(keys) > 1 else keys[0] > after[0])
+        query = query.add_columns(*(key.label(f"_key{i}") for i, key in enumerate(keys)))
+        result = await db.execute(query.order_by(*keys).limit(params.limit + 1))
+        files = [row._asdict() for row in result]
+        # Точных совпадений нет: ищем с опечатками
+        if files or after is not None or mode != "exact" or not params.fuzzy:
+            break
+        mode, ranked = "fuzzy", None
+
+    cursor = None
+    if len(files) > params.limit:
+        files = files[:params.limit]
+        cursor = encode_cursor([mode, int(ranked), *(files[-1][f"_key{i}"] for i in range(len(keys)))])
+    for file in files:
+        key_values = [file.pop(f"_key{i}") for i in range(len(keys))]
+        file["score"] = key_values[0] if ranked else None
+        file["tags"] = file["tags"].split(",") if file["tags"] else []
+    return {"items": files, "next_cursor": cursor, "mode": mode, "ranked": ranked}
+
+
+@router.get("/files/search")
+async def get_search(request: Request,
+                     params: FileSearchParams = Depends(),
+                     user: User = Depends(get_current_user),
+                     db: AsyncSession = Depends(get_db)):
+    is_admin = bool(user and user.is_admin)
+    key = page_cache.key("search", is_admin, *astuple(params))
+    etag = page_cache.etag(key)
+    if is_fresh(request.headers, etag):
+        return cached_response(None, etag)
+    body = page_cache.get(key)
+    if body is None:
+        body = JSONResponse(await search_files(db, params, is_admin)).body
+        page_cache.set(key, body)
+    return cached_response(body, etag, "application/json")
 
 
 @router.get("/download/{file_id}")
 async def download_file(file_id: int,
+                        request: Request,
                         current_user: User = Depends(get_current_user),
                         db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(File).filter(File.id == file_id))
@@ -114,9 +583,38 @@ async def download_file(file_id: int,
     if not current_user.is_admin:
         if not file.access_granted:
             raise HTTPException(status_code=403, detail="You can not download this file.")
-    file.upload_count += 1
-    await db.commit()
-    return FileResponse(file.path, filename=file.filename)
+    path = storage.local_path(file.content_hash) if file.content_hash else file.path
+    if path is None:
+        # Хранилище без локальных файлов: отдаём временную ссылку
+        download_counter.increment(file.id)
+        return RedirectResponse(await storage.url(file.content_hash, file.filename), status_code=status.HTTP_302_FOUND)
+    try:
+        stat_result = await fs.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    headers, etag = {}, file.content_hash
+    if file.content_hash and is_compressible(file.filename):
+        headers["vary"] = "Accept-Encoding"
+        # Заранее сжатый вариант; диапазоны всегда считаются по исходным байтам
+        variant = storage.variant_path(file.content_hash, "gzip")
+        if variant and "range" not in request.headers and \
+                accepts_encoding(request.headers.get("accept-encoding"), "gzip"):
+            try:
+                stat_result, path = await fs.stat(variant), variant
+                headers["content-encoding"], etag = "gzip", f"{file.content_hash}-gzip"
+            except FileNotFoundError:
+                pass
+
+    response = DownloadResponse(path, filename=file.filename, stat_result=stat_result,
+                                content_hash=etag, headers=headers)
+    if response.is_not_modified(request.headers):
+        return response.not_modified()
+    # Продолжение докачки не считается новым скачиванием
+    http_range = request.headers.get("range")
+    if not http_range or http_range.replace(" ", "").startswith("bytes=0-"):
+        download_counter.increment(file.id)
+    return response
 
 
 @router.delete("/delete/{file_id}")
@@ -131,6 +629,116 @@ async def delete_file(file_id: int,
         raise HTTPException(status_code=404, detail="File not found")
     await db.delete(file)
     await db.commit()
-    os.remove(file.path)
+    page_cache.bump()
+    await release_blobs([(file.content_hash, file.path)])
     response = RedirectResponse(url="/files", status_code=status.HTTP_200_OK)
     return response
+
+
+# Пакетные операции: один UPDATE/DELETE на пачку id вместо запроса и коммита на каждый файл
+
+def elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def batch_conditions(batch: FileBatch) -> list[list]:
+    """WHERE clauses for every statement of a batch: ids are split into chunks of FILES_BATCH_SIZE."""
+    conditions = file_conditions(**batch.filter.model_dump()) if batch.filter else []
+    if batch.ids is None:
+        if not conditions:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail="Pass ids or a non-empty filter")
+        return [conditions]
+    ids = sorted(set(batch.ids))
+    return [[File.id.in_(ids[i:i + FILES_BATCH_SIZE]), *conditions] for i in range(0, len(ids), FILES_BATCH_SIZE)]
+
+
+@router.post("/files/batch/upload",
+             openapi_extra=multipart_body(["uploaded_files"], uploaded_files={
+                 "type": "array", "items": {"type": "string", "format": "binary"}}))
+async def upload_files(request: Request,
+                       db: AsyncSession = Depends(get_db),
+                       user: User = Depends(get_current_user)):
+    if not user or not user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can upload files")
+    started = time.perf_counter()
+
+    # Файлы приходят в теле друг за другом и пишутся во временные файлы по мере чтения
+    form = await stage_multipart(request)
+    staged_files = form.files_of("uploaded_files")
+    await form.discard(keep=[staged for _, staged in staged_files])
+    stage_ms = elapsed_ms(started)
+    if not staged_files:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="uploaded_files is required")
+
+    filenames = [os.path.basename(filename) for filename, _ in staged_files]
+    result = await db.execute(select(File.filename).where(File.filename.in_(set(filenames))))
+    conflicts = set(result.scalars()) | {name for name, count in Counter(filenames).items() if count > 1}
+    if conflicts:
+        await form.discard()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail={"message": "File with this name already exists in the database",
+                                    "filenames": sorted(conflicts)})
+    await db.commit()
+
+    store_started = time.perf_counter()
+    new_files, failed = await store_files(db, [(staged, filename) for (_, staged), filename
+                                               in zip(staged_files, filenames)], user.id)
+    return {"files": [{"id": None if file.content_hash in failed else file.id,
+                       "filename": file.filename,
+                       "size": file.size,
+                       "content_hash": file.content_hash,
+                       "status": file.status,
+                       "stored": file.content_hash not in failed} for file in new_files],
+            "timing": {"stage_ms": stage_ms, "store_ms": elapsed_ms(store_started), "total_ms": elapsed_ms(started)}}
+
+
+@router.put("/files/batch/access")
+async def update_files_access(request: FileBatchAccess,
+                              user: User = Depends(get_current_user),
+                              db: AsyncSession = Depends(get_db)):
+    if not user or not user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can change files.")
+    started = time.perf_counter()
+    batches = []
+    for conditions in batch_conditions(request):
+        batch_started = time.perf_counter()
+        result = await db.execute(update(File).where(*conditions)
+                                  .values(access_granted=request.access_granted)
+                                  .execution_options(synchronize_session=False))
+        batches.append({"rows": result.rowcount, "ms": elapsed_ms(batch_started)})
+    commit_started = time.perf_counter()
+    await db.commit()
+    page_cache.bump()
+    return {"updated": sum(batch["rows"] for batch in batches),
+            "batches": batches,
+            "commit_ms": elapsed_ms(commit_started),
+            "total_ms": elapsed_ms(started)}
+
+
+@router.post("/files/batch/delete")
+async def delete_files(request: FileBatch,
+                       background_tasks: BackgroundTasks,
+                       user: User = Depends(get_current_user),
+                       db: AsyncSession = Depends(get_db)):
+    if not user or not user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can delete files")
+    started = time.perf_counter()
+    batches, deleted = [], []
+    for conditions in batch_conditions(request):
+        batch_started = time.perf_counter()
+        result = await db.execute(delete(File).where(*conditions)
+                                  .returning(File.content_hash, File.path)
+                                  .execution_options(synchronize_session=False))
+        rows = result.all()
+        deleted.extend((row.content_hash, row.path) for row in rows)
+        batches.append({"rows": len(rows), "ms": elapsed_ms(batch_started)})
+    commit_started = time.perf_counter()
+    await db.commit()
+    page_cache.bump()
+    # Блобы удаляются уже после ответа: запрос не ждёт диска
+    background_tasks.add_task(release_blobs, deleted)
+    return {"deleted": len(deleted),
+            "batches": batches,
+            "commit_ms": elapsed_ms(commit_started),
+            "total_ms": elapsed_ms(started)}
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, HTTPException, Request, status
+from starlette.responses import PlainTextResponse
+
+from app.config import METRICS_TOKEN
+from app.utils.metrics import registry
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    # Скрейпер Prometheus ходит без cookie, поэтому отдельный токен вместо логина
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return PlainTextResponse(registry.expose(), media_type="text/plain; version=0.0.4")
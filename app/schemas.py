@@ -16,11 +16,34 @@ class UserOut(BaseModel):
 
 
 class FileOut(BaseModel):
-    access_granted: bool
+    access_granted: bool | None = None
+    description: str | None = None
+    tags: list[str] | None = None
 
     class Config:
         from_attributes = True
 
 
+class FileBatchFilter(BaseModel):
+    prefix: str | None = None
+    owner: str | None = None
+    access_granted: bool | None = None
+
+
+class FileBatch(BaseModel):
+    ids: list[int] | None = None
+    filter: FileBatchFilter | None = None
+
+
+class FileBatchAccess(FileBatch):
+    access_granted: bool
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    total_size: int
+    chunk_size: int | None = None
+
+
 class TokenData(BaseModel):
     username: str | None = None
@@ -0,0 +1,147 @@
+"""Production entry point: prepare the database once, then start several uvicorn workers.
+
+    python -m app.serve --workers 4 --host 0.0.0.0 --port 8000
+
+The parent process brings the schema up to date, requeues background jobs
+interrupted by the previous run and precompresses static files before any
+worker exists, so workers skip all of it (``INIT_ON_STARTUP=false``) and never
+race each other over DDL. With more than one worker the caches and
+counters are kept in step through ``SHARED_STATE_BACKEND=sqlite`` unless another
+backend was chosen explicitly.
+"""
+import argparse
+import asyncio
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def alembic_config():
+    from alembic.config import Config
+
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT, "alembic"))
+    return config
+
+
+def inspect_schema(connection) -> tuple[bool, bool, bool]:
+    """(has alembic_version, has any app table, every model column exists)."""
+    from sqlalchemy import inspect
+
+    from app.models import Base
+
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    current = True
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            current = False
+            break
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        if not set(table.columns.keys()) <= columns:
+            current = False
+            break
+    return "alembic_version" in tables, bool(tables & set(Base.metadata.tables)), current
+
+
+async def create_schema() -> None:
+    from app.database import engine
+    from app.models import Base
+    from app.utils.search import create_search_index
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_search_index)
+
+
+async def schema_state() -> tuple[bool, bool, bool]:
+    from app.database import engine
+
+    async with engine.connect() as conn:
+        return await conn.run_sync(inspect_schema)
+
+
+def migrate() -> str:
+    """Bring the database to the latest revision; returns what was done."""
+    from alembic import command
+
+    from app.database import engine
+
+    versioned, has_tables, current = asyncio.run(schema_state())
+    asyncio.run(engine.dispose())
+    config = alembic_config()
+    if versioned:
+        command.upgrade(config, "head")
+        return "upgraded"
+    if not has_tables or current:
+        # Новая база или созданная create_all: миграции применять не к чему, только отметить версию
+        asyncio.run(create_schema())
+        asyncio.run(engine.dispose())
+        command.stamp(config, "head")
+        return "created" if not has_tables else "stamped"
+    # Старая база без alembic_version: схема первых ревизий
+    command.upgrade(config, "head")
+    return "upgraded"
+
+
+def recover_jobs() -> int:
+    from app.database import engine
+    from app.utils.jobs import job_queue
+
+    async def recover():
+        try:
+            return await job_queue.recover()
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(recover())
+
+
+def precompress_static() -> None:
+    from app.utils.compression import precompress_directory
+
+    precompress_directory(os.path.join(ROOT, "app", "static"))
+
+
+def reset_shared_state() -> None:
+    from app.config import SHARED_STATE_BACKEND, SHARED_STATE_PATH
+
+    # Счётчики общего состояния считаются с запуска сервера, как и у одного процесса
+    if SHARED_STATE_BACKEND == "sqlite":
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(SHARED_STATE_PATH + suffix)
+            except FileNotFoundError:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--no-access-log", action="store_true")
+    parser.add_argument("--skip-migrations", action="store_true", help="the schema is managed elsewhere")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        os.environ.setdefault("SHARED_STATE_BACKEND", "sqlite")
+
+    import uvicorn
+
+    if not args.skip_migrations:
+        print(f"Database {migrate()}")
+    # Воркеров ещё нет, значит все running-задачи прерваны прошлым запуском
+    print(f"Recovered {recover_jobs()} interrupted jobs")
+    precompress_static()
+    reset_shared_state()
+
+    # Воркеры наследуют окружение родителя
+    os.environ["INIT_ON_STARTUP"] = "false"
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers, log_level=args.log_level,
+                access_log=not args.no_access_log)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import gzip
+import mimetypes
+import os
+import shutil
+import stat
+import uuid
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+from starlette.types import Scope
+
+from app.config import COMPRESS_MIN_SIZE, COMPRESS_MAX_RATIO, COMPRESS_LEVEL
+from app.utils.downloads import DownloadResponse
+from app.utils.fs import fs
+
+COMPRESSIBLE_PREFIXES = ("text/",)
+COMPRESSIBLE_TYPES = {
+    "application/json", "application/xml", "application/javascript", "application/x-javascript",
+    "application/ld+json", "application/x-ndjson", "application/sql", "application/x-sh",
+    "application/x-yaml", "application/yaml", "application/toml", "image/svg+xml",
+}
+# Расширения, которых нет в mimetypes, но которые хорошо сжимаются
+COMPRESSIBLE_EXTENSIONS = {".log", ".ndjson", ".yaml", ".yml", ".toml", ".md", ".ini", ".cfg", ".tsv"}
+
+
+def is_compressible(filename: str) -> bool:
+    media_type = mimetypes.guess_type(filename)[0]
+    if media_type and (media_type.startswith(COMPRESSIBLE_PREFIXES) or media_type in COMPRESSIBLE_TYPES):
+        return True
+    return os.path.splitext(filename)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def accepts_encoding(accept_encoding: str | None, encoding: str) -> bool:
+    """True if the Accept-Encoding header allows ``encoding`` (q > 0)."""
+    if not accept_encoding:
+        return False
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() not in (encoding, "*"):
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def write_gzip_variant(source: str, target: str,
+                       min_size: int = COMPRESS_MIN_SIZE, max_ratio: float = COMPRESS_MAX_RATIO) -> bool:
+    """Write ``target`` as gzip of ``source`` if it is big enough and actually shrinks.
+
+    Returns True when a usable variant exists afterwards.
+    """
+    if os.path.exists(target):
+        return True
+    size = os.path.getsize(source)
+    if size < min_size:
+        return False
+    temp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(source, "rb") as src, open(temp_path, "wb") as raw:
+            # mtime=0: одинаковое содержимое даёт одинаковые байты варианта
+            with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=COMPRESS_LEVEL, mtime=0) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        if os.path.getsize(temp_path) > size * max_ratio:
+            os.remove(temp_path)
+            return False
+        os.replace(temp_path, target)
+        return True
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves ``<file>.gz`` next to a file when the client accepts gzip.
+
+    Files are looked up and sent with ``DownloadResponse``, so their stat calls and reads
+    go through the bounded ``fs`` pool like downloads do.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+        try:
+            full_path, stat_result = await fs.run("stat", self.lookup_path, path)
+        except OSError:
+            full_path, stat_result = None, None
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            # Каталоги, 404 и ошибки доступа обрабатывает сам StaticFiles
+            return await super().get_response(path, scope)
+
+        request_headers = Headers(scope=scope)
+        response = self.file_response(full_path, stat_result, scope)
+        if response.status_code != 200:
+            return response
+        response.headers["vary"] = "Accept-Encoding"
+        # Диапазоны считаются по исходным байтам
+        if "range" in request_headers or not accepts_encoding(request_headers.get("accept-encoding"), "gzip"):
+            return response
+
+        full_path, stat_result = await fs.run("stat", self.lookup_path, path + ".gz")
+        if stat_result is None:
+            return response
+        compressed = DownloadResponse(full_path, stat_result=stat_result, media_type=response.media_type,
+                                      headers={"content-encoding": "gzip", "vary": "Accept-Encoding"})
+        if self.is_not_modified(compressed.headers, request_headers):
+            return NotModifiedResponse(compressed.headers)
+        return compressed
+
+    def file_response(self, full_path: str, stat_result: os.stat_result, scope: Scope,
+                      status_code: int = 200) -> Response:
+        response = DownloadResponse(full_path, stat_result=stat_result, status_code=status_code)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def precompress_directory(directory: str) -> None:
+    """Create or refresh ``.gz`` variants for compressible files under ``directory``."""
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if filename.endswith(".gz") or not is_compressible(filename):
+                continue
+            source = os.path.join(root, filename)
+            target = source + ".gz"
+            if os.path.exists(target) and os.path.getmtime(target) < os.path.getmtime(source):
+                os.remove(target)
+            try:
+                write_gzip_variant(source, target, min_size=0)
+            except OSError:
+                # Каталог только для чтения: отдаём без сжатия
+                return
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+
+from sqlalchemy import bindparam, func, update
+
+from app.config import DOWNLOAD_COUNTER_FLUSH_SECONDS
+from app.database import SessionLocal
+from app.models import File
+from app.utils.page_cache import page_cache
+from app.utils.shared_state import shared_state
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadCounter:
+    """Accumulates download increments in memory and writes them in one batched UPDATE."""
+
+    def __init__(self, flush_interval: float = DOWNLOAD_COUNTER_FLUSH_SECONDS):
+        self.flush_interval = flush_interval
+        self._pending: Counter[int] = Counter()
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self.flushes = 0
+        self.flushed_increments = 0
+        self.failed_flushes = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    def increment(self, file_id: int, n: int = 1) -> None:
+        self._pending[file_id] += n
+        shared_state.incr("file_downloads", n)
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, Counter()
+            started = time.perf_counter()
+            try:
+                async with SessionLocal() as db:
+                    files = File.__table__
+                    await db.execute(
+                        update(files)
+                        .where(files.c.id == bindparam("file_id"))
+                        .values(upload_count=func.coalesce(files.c.upload_count, 0) + bindparam("n")),
+                        [{"file_id": file_id, "n": n} for file_id, n in batch.items()],
+                    )
+                    await db.commit()
+            except Exception:
+                # Не теряем счётчики: вернём их в очередь до следующей попытки
+                self._pending.update(batch)
+                self.failed_flushes += 1
+                raise
+            elapsed = time.perf_counter() - started
+            # upload_count показывается только в списках файлов
+            page_cache.bump_listings()
+            self.flushes += 1
+            self.flushed_increments += sum(batch.values())
+            self.last_flush_seconds = elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+            return len(batch)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Download counter flush failed")
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {"pending_files": len(self._pending),
+                "pending_increments": sum(self._pending.values()),
+                "flushes": self.flushes,
+                "failed_flushes": self.failed_flushes,
+                "flushed_increments": self.flushed_increments,
+                "last_flush_seconds": self.last_flush_seconds,
+                "max_flush_seconds": self.max_flush_seconds}
+
+
+download_counter = DownloadCounter()
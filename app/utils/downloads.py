@@ -0,0 +1,191 @@
+import os
+from secrets import token_hex
+from email.utils import formatdate, parsedate_to_datetime
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, PlainTextResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from app.utils.fs import fs
+
+ZERO_COPY_EXTENSION = "http.response.zerocopysend"
+PATH_SEND_EXTENSION = "http.response.pathsend"
+
+
+class MalformedRange(Exception):
+    pass
+
+
+class UnsatisfiableRange(Exception):
+    pass
+
+
+def parse_range_header(http_range: str, file_size: int) -> list[tuple[int, int]]:
+    """Parse an RFC 7233 bytes range header into sorted, merged half-open ``(start, end)`` pairs."""
+    units, _, spec = http_range.partition("=")
+    if units.strip().lower() != "bytes" or not spec:
+        raise MalformedRange("Only bytes ranges are supported")
+
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, sep, last = part.partition("-")
+        first, last = first.strip(), last.strip()
+        if not sep or not (first.isdigit() or last.isdigit()) or \
+                (first and not first.isdigit()) or (last and not last.isdigit()):
+            raise MalformedRange("Invalid range")
+        if not first:
+            # Суффикс: последние N байт
+            length = int(last)
+            if length == 0:
+                continue
+            ranges.append((max(file_size - length, 0), file_size))
+            continue
+        start = int(first)
+        end = min(int(last) + 1, file_size) if last else file_size
+        if last and int(last) < start:
+            raise MalformedRange("Range start must not exceed range end")
+        if start >= file_size:
+            continue
+        ranges.append((start, end))
+
+    if not ranges:
+        raise UnsatisfiableRange()
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def etag_values(header: str) -> list[str]:
+    return [value.strip().removeprefix("W/") for value in header.split(",") if value.strip()]
+
+
+class DownloadResponse(FileResponse):
+    """FileResponse with a strong content-hash ETag, conditional requests and zero-copy sending.
+
+    Ranges are served as 206 (``multipart/byteranges`` for more than one range). When the
+    ASGI server offers the zero-copy extension the file descriptor is handed to it and the
+    kernel sends the bytes (``os.sendfile``); otherwise the file is streamed in chunks read
+    through the bounded ``fs`` pool.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(self, path: str, *, filename: str | None = None, stat_result: os.stat_result,
+                 content_hash: str | None = None, **kwargs) -> None:
+        headers = dict(kwargs.pop("headers", None) or {})
+        if content_hash:
+            headers.setdefault("etag", f'"{content_hash}"')
+        super().__init__(path, filename=filename, stat_result=stat_result, headers=headers, **kwargs)
+        self.strong_etag = bool(content_hash)
+
+    def is_not_modified(self, request_headers: Headers) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            if if_none_match.strip() == "*":
+                return True
+            return self.headers["etag"].removeprefix("W/") in etag_values(if_none_match)
+
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(self.stat_result.st_mtime) <= since
+        return False
+
+    def not_modified(self) -> Response:
+        headers = {key: self.headers[key] for key in ("etag", "last-modified", "accept-ranges")}
+        return Response(status_code=304, headers=headers)
+
+    def _range_allowed(self, http_if_range: str | None) -> bool:
+        if http_if_range is None:
+            return True
+        if http_if_range.startswith('"') or http_if_range.startswith("W/"):
+            # If-Range допускает только сильное сравнение
+            return self.strong_etag and http_if_range == self.headers["etag"]
+        return http_if_range == formatdate(self.stat_result.st_mtime, usegmt=True)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        send_header_only = scope["method"].upper() == "HEAD"
+        headers = Headers(scope=scope)
+        http_range = headers.get("range")
+        file_size = self.stat_result.st_size
+        extensions = scope.get("extensions") or {}
+
+        if http_range is None or not self._range_allowed(headers.get("if-range")):
+            await self._send_full(send, send_header_only, extensions)
+        else:
+            try:
+                ranges = parse_range_header(http_range, file_size)
+            except MalformedRange as exc:
+                return await PlainTextResponse(str(exc), status_code=400)(scope, receive, send)
+            except UnsatisfiableRange:
+                response = PlainTextResponse(status_code=416, headers={"content-range": f"bytes */{file_size}"})
+                return await response(scope, receive, send)
+
+            if len(ranges) == 1:
+                start, end = ranges[0]
+                self.headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+                self.headers["content-length"] = str(end - start)
+                await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+                if send_header_only:
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+                else:
+                    await self._send_span(send, start, end, extensions, more_body=False)
+            else:
+                await self._send_multiple_ranges(send, ranges, file_size, send_header_only, extensions)
+
+        if self.background is not None:
+            await self.background()
+
+    async def _send_full(self, send: Send, send_header_only: bool, extensions: dict) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif PATH_SEND_EXTENSION in extensions:
+            await send({"type": PATH_SEND_EXTENSION, "path": os.fspath(self.path)})
+        else:
+            await self._send_span(send, 0, self.stat_result.st_size, extensions, more_body=False)
+
+    async def _send_multiple_ranges(self, send: Send, ranges: list[tuple[int, int]], file_size: int,
+                                    send_header_only: bool, extensions: dict) -> None:
+        boundary = token_hex(13)
+        content_length, part_header = self.generate_multipart(ranges, boundary, file_size, self.headers["content-type"])
+        self.headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+        self.headers["content-length"] = str(content_length)
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        if send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        for start, end in ranges:
+            await send({"type": "http.response.body", "body": part_header(start, end), "more_body": True})
+            await self._send_span(send, start, end, extensions, more_body=True)
+            await send({"type": "http.response.body", "body": b"\n", "more_body": True})
+        await send({"type": "http.response.body", "body": f"\n--{boundary}--\n".encode("latin-1"), "more_body": False})
+
+    async def _send_span(self, send: Send, start: int, end: int, extensions: dict, more_body: bool) -> None:
+        if ZERO_COPY_EXTENSION in extensions:
+            with await fs.open(self.path) as file:
+                await send({"type": ZERO_COPY_EXTENSION, "file": file.fileno(),
+                            "offset": start, "count": end - start, "more_body": more_body})
+            return
+        # Запасной вариант: чтение файла кусками
+        with await fs.open(self.path) as file:
+            while True:
+                chunk = await fs.read(file, min(self.chunk_size, end - start), start)
+                start += len(chunk)
+                last = not chunk or start >= end
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body or not last})
+                if last:
+                    break
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import shutil
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from app.config import FS_WORKERS
+from app.utils.metrics import Histogram
+
+
+class AsyncFileSystem:
+    """Filesystem calls for async code, run in a dedicated bounded thread pool.
+
+    A slow disk or network mount then only fills this pool: the event loop and
+    Starlette's shared threadpool keep serving other requests. Every call is timed
+    into a per-operation latency histogram.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fs")
+        self.latency: defaultdict[str, Histogram] = defaultdict(Histogram)
+        self.pending = 0
+        self.max_pending = 0
+
+    async def run(self, operation: str, fn, *args, **kwargs):
+        """Run a blocking ``fn`` in the pool, recording its latency under ``operation``."""
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, partial(fn, *args, **kwargs))
+        finally:
+            self.pending -= 1
+            self.latency[operation].observe(time.perf_counter() - started)
+
+    async def stat(self, path: str) -> os.stat_result:
+        return await self.run("stat", os.stat, path)
+
+    async def exists(self, path: str) -> bool:
+        return await self.run("exists", os.path.exists, path)
+
+    async def remove(self, path: str, missing_ok: bool = False) -> None:
+        try:
+            await self.run("remove", os.remove, path)
+        except FileNotFoundError:
+            if not missing_ok:
+                raise
+
+    async def rename(self, source: str, target: str) -> None:
+        """Atomically move ``source`` to ``target``, replacing it if it exists."""
+        await self.run("rename", os.replace, source, target)
+
+    async def makedirs(self, path: str) -> None:
+        await self.run("makedirs", os.makedirs, path, exist_ok=True)
+
+    async def rmtree(self, path: str) -> None:
+        await self.run("rmtree", shutil.rmtree, path, True)
+
+    async def open(self, path: str, mode: str = "rb"):
+        return await self.run("open", open, path, mode)
+
+    async def read(self, f, size: int, offset: int) -> bytes:
+        """Read up to ``size`` bytes at ``offset`` without moving the file position."""
+        return await self.run("read", os.pread, f.fileno(), size, offset)
+
+    async def write(self, f, data: bytes) -> int:
+        return await self.run("write", f.write, data)
+
+    def stats(self) -> dict:
+        return {"workers": self.workers,
+                "in_flight": min(self.pending, self.workers),
+                "queued": max(self.pending - self.workers, 0),
+                "max_queued": max(self.max_pending - self.workers, 0),
+                "operations": {operation: histogram.stats() for operation, histogram in sorted(self.latency.items())}}
+
+
+fs = AsyncFileSystem(FS_WORKERS)
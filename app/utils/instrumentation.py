@@ -0,0 +1,156 @@
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.fs import fs
+from app.utils.loop_monitor import loop_stall_detector
+from app.utils.metrics import CounterMetric, GaugeMetric, HistogramMetric, registry
+from app.utils.page_cache import page_cache
+from app.utils.passwords import password_hasher
+from app.utils.shared_state import shared_state
+
+# Запросов к БД на один HTTP-запрос: 0 при попадании в кэш, десятки - уже N+1
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+HTTP_REQUESTS = registry.register(CounterMetric(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")))
+HTTP_LATENCY = registry.register(HistogramMetric(
+    "http_request_duration_seconds", "Time until the response is fully sent", ("method", "route")))
+HTTP_IN_FLIGHT = registry.register(GaugeMetric(
+    "http_requests_in_flight", "Requests being handled right now"))
+HTTP_REQUEST_BYTES = registry.register(CounterMetric(
+    "http_request_body_bytes_total", "Request body bytes received (uploads)", ("method", "route")))
+HTTP_RESPONSE_BYTES = registry.register(CounterMetric(
+    "http_response_body_bytes_total", "Response body bytes sent (downloads)", ("method", "route")))
+DB_STATEMENTS = registry.register(CounterMetric(
+    "db_statements_total", "SQL statements executed"))
+DB_STATEMENT_SECONDS = registry.register(HistogramMetric(
+    "db_statement_duration_seconds", "Time spent in a single SQL statement"))
+DB_STATEMENTS_PER_REQUEST = registry.register(HistogramMetric(
+    "http_request_db_statements", "SQL statements issued while handling a request", ("method", "route"),
+    buckets=STATEMENT_BUCKETS))
+DB_SECONDS_PER_REQUEST = registry.register(HistogramMetric(
+    "http_request_db_seconds", "Time spent in SQL while handling a request", ("method", "route")))
+# Суммы по всем воркерам: какой бы воркер ни ответил на /metrics, значение общее
+registry.register(CounterMetric(
+    "files_uploaded_total", "Files stored through upload endpoints, all workers",
+    function=lambda: shared_state.counter("files_uploaded")))
+registry.register(CounterMetric(
+    "file_downloads_total", "Counted file downloads, all workers",
+    function=lambda: shared_state.counter("file_downloads")))
+registry.register(GaugeMetric(
+    "password_hash_queue_depth", "bcrypt calls waiting for a worker", function=lambda: password_hasher.queued))
+registry.register(GaugeMetric(
+    "password_hash_in_flight", "bcrypt calls running", function=lambda: password_hasher.in_flight))
+registry.register(GaugeMetric(
+    "fs_queue_depth", "Filesystem calls waiting for a worker", function=lambda: max(fs.pending - fs.workers, 0)))
+registry.register(CounterMetric(
+    "event_loop_stalls_total", "Event loop lags above the stall threshold",
+    function=lambda: loop_stall_detector.stalls))
+registry.register(CounterMetric(
+    "page_cache_hits_total", "Rendered page and fragment cache hits", function=lambda: page_cache.hits))
+registry.register(CounterMetric(
+    "page_cache_misses_total", "Rendered page and fragment cache misses", function=lambda: page_cache.misses))
+
+# [statements, seconds] текущего HTTP-запроса; список общий и для задач, порождённых внутри запроса
+_request_db: ContextVar[list | None] = ContextVar("request_db", default=None)
+
+
+def route_label(scope: Scope) -> str:
+    """Route template (``/download/{file_id}``), mount path for static files, so labels stay bounded."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    return scope.get("root_path") or "unmatched"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+    DB_STATEMENTS.inc()
+    DB_STATEMENT_SECONDS.observe(elapsed)
+    stats = _request_db.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("metrics_started"):
+        connection.info["metrics_started"].pop()
+
+
+ENGINE_HOOKS = {"before_cursor_execute": _before_cursor_execute,
+                "after_cursor_execute": _after_cursor_execute,
+                "handle_error": _handle_error}
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Count and time every SQL statement, globally and for the request that issued it."""
+    for name, hook in ENGINE_HOOKS.items():
+        event.listen(engine.sync_engine, name, hook)
+
+
+def uninstrument_engine(engine: AsyncEngine) -> None:
+    for name, hook in ENGINE_HOOKS.items():
+        event.remove(engine.sync_engine, name, hook)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no extra task per request) recording latency, bytes and SQL per route."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code, received, sent, declared_length, file_sent = 500, 0, 0, 0, False
+        db_stats = [0, 0.0]
+        token = _request_db.set(db_stats)
+        HTTP_IN_FLIGHT.inc()
+
+        async def receive_wrapper() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, sent, declared_length, file_sent
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name == b"content-length":
+                        declared_length = int(value)
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            elif message["type"] in ("http.response.pathsend", "http.response.zerocopysend"):
+                # Файл отдаёт сервер, тела в сообщениях нет
+                file_sent = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec()
+            _request_db.reset(token)
+            method, route = scope["method"], route_label(scope)
+            HTTP_REQUESTS.inc(1, method, route, str(status_code))
+            HTTP_LATENCY.observe(elapsed, method, route)
+            HTTP_REQUEST_BYTES.inc(received, method, route)
+            HTTP_RESPONSE_BYTES.inc(declared_length if file_sent else sent, method, route)
+            DB_STATEMENTS_PER_REQUEST.observe(db_stats[0], method, route)
+            DB_SECONDS_PER_REQUEST.observe(db_stats[1], method, route)
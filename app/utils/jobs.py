@@ -0,0 +1,229 @@
+import asyncio
+import datetime
+import logging
+import os
+import random
+import time
+import uuid
+from collections import Counter
+from typing import Awaitable, Callable
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import (JOB_CONCURRENCY, JOB_MAX_ATTEMPTS, JOB_RETRY_BASE_SECONDS, JOB_RETRY_MAX_SECONDS,
+                        JOB_POLL_SECONDS, JOB_LEASE_SECONDS, JOB_RETENTION_SECONDS)
+from app.database import SessionLocal
+from app.models import File, Job
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[AsyncSession, Job], Awaitable[None]]
+
+
+class JobQueue:
+    """Background jobs persisted in the ``jobs`` table and run by every worker process.
+
+    ``enqueue`` only adds the row to the caller's session, so a job is committed in the
+    same transaction as the data it refers to, and ``notify`` wakes the runner after
+    the commit. A job enqueued with ``hold=True`` stays ``waiting`` until ``release``, for
+    work whose input is only ready after the commit. A job is claimed with a conditional UPDATE, so each runs in one worker
+    at a time; a failed job is retried with exponential backoff up to ``max_attempts``,
+    then the kind's ``on_failure`` is called. Jobs left ``running`` (or never released from
+    ``waiting``) by a crashed worker are picked up again after ``lease`` seconds, ``running``
+    ones also at once by ``recover`` on startup.
+    """
+
+    def __init__(self, concurrency: int = JOB_CONCURRENCY, poll_interval: float = JOB_POLL_SECONDS,
+                 max_attempts: int = JOB_MAX_ATTEMPTS, retry_base: float = JOB_RETRY_BASE_SECONDS,
+                 retry_max: float = JOB_RETRY_MAX_SECONDS, lease: float = JOB_LEASE_SECONDS,
+                 retention: float = JOB_RETENTION_SECONDS):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.lease = lease
+        self.retention = retention
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._handlers: dict[str, tuple[JobHandler, JobHandler | None]] = {}
+        self._running: dict[int, asyncio.Task] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self._maintained_at = 0.0
+        self.outcomes: Counter[str] = Counter()
+
+    def register(self, kind: str, handler: JobHandler, on_failure: JobHandler | None = None) -> None:
+        self._handlers[kind] = (handler, on_failure)
+
+    def enqueue(self, db: AsyncSession, kind: str, file: File | None = None, payload: dict | None = None,
+                max_attempts: int | None = None, hold: bool = False) -> Job:
+        # file, а не file_id: id новой строки появится только при flush вместе с задачей
+        job = Job(kind=kind, file=file, payload=payload, status="waiting" if hold else "pending", attempts=0,
+                  max_attempts=max_attempts or self.max_attempts, run_at=datetime.datetime.utcnow())
+        db.add(job)
+        return job
+
+    async def release(self, db: AsyncSession, jobs: list[Job]) -> None:
+        """Make held jobs runnable; the caller commits and then calls ``notify``."""
+        if jobs:
+            await db.execute(update(Job).where(Job.id.in_([job.id for job in jobs]), Job.status == "waiting")
+                             .values(status="pending", run_at=datetime.datetime.utcnow()))
+
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.retry_base * 2 ** (attempts - 1), self.retry_max)
+        # Разброс, чтобы повторы после общего сбоя не шли одной волной
+        return delay * random.uniform(0.5, 1.0)
+
+    async def recover(self) -> int:
+        """Return jobs interrupted by a crash to the queue; call only when no worker is running jobs."""
+        async with SessionLocal() as db:
+            result = await db.execute(update(Job).where(Job.status == "running")
+                                      .values(status="pending", locked_by=None, locked_at=None))
+            await db.commit()
+        return result.rowcount
+
+    async def _maintain(self) -> None:
+        now = datetime.datetime.utcnow()
+        async with SessionLocal() as db:
+            # Воркер, взявший задачу, умер: аренда истекла
+            await db.execute(update(Job)
+                             .where(Job.status == "running",
+                                    Job.locked_at < now - datetime.timedelta(seconds=self.lease))
+                             .values(status="pending", locked_by=None, locked_at=None))
+            # Воркер умер, не успев отпустить отложенную задачу
+            await db.execute(update(Job)
+                             .where(Job.status == "waiting",
+                                    Job.created_at < now - datetime.timedelta(seconds=self.lease))
+                             .values(status="pending", run_at=now))
+            await db.execute(delete(Job).where(Job.status == "done",
+                                               Job.updated_at < now - datetime.timedelta(seconds=self.retention)))
+            await db.commit()
+
+    async def _claim(self, limit: int) -> list[Job]:
+        now = datetime.datetime.utcnow()
+        async with SessionLocal() as db:
+            result = await db.execute(select(Job.id)
+                                      .where(Job.status == "pending", Job.run_at <= now)
+                                      .order_by(Job.run_at, Job.id).limit(limit))
+            claimed = []
+            for job_id in result.scalars():
+                # Другой воркер мог успеть раньше
+                updated = await db.execute(update(Job).where(Job.id == job_id, Job.status == "pending")
+                                           .values(status="running", locked_by=self.origin, locked_at=now,
+                                                   attempts=Job.attempts + 1))
+                if updated.rowcount == 1:
+                    claimed.append(job_id)
+            await db.commit()
+            if not claimed:
+                return []
+            result = await db.execute(select(Job).where(Job.id.in_(claimed)))
+            return list(result.scalars())
+
+    async def _finish(self, job: Job, **values) -> None:
+        async with SessionLocal() as db:
+            await db.execute(update(Job).where(Job.id == job.id, Job.locked_by == self.origin)
+                             .values(locked_by=None, locked_at=None, **values))
+            await db.commit()
+
+    async def _execute(self, job: Job) -> None:
+        handler, on_failure = self._handlers.get(job.kind, (None, None))
+        try:
+            if handler is None:
+                raise RuntimeError(f"No handler for job kind {job.kind!r}")
+            async with SessionLocal() as db:
+                await handler(db, job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            if job.attempts < job.max_attempts:
+                delay = self.backoff(job.attempts)
+                logger.warning("Job %s (%s) failed, retry in %.1fs: %s", job.id, job.kind, delay, error)
+                await self._finish(job, status="pending", last_error=error,
+                                   run_at=datetime.datetime.utcnow() + datetime.timedelta(seconds=delay))
+                self.outcomes["retried"] += 1
+            else:
+                logger.error("Job %s (%s) failed after %d attempts: %s", job.id, job.kind, job.attempts, error)
+                await self._finish(job, status="failed", last_error=error)
+                self.outcomes["failed"] += 1
+                if on_failure is not None:
+                    async with SessionLocal() as db:
+                        await on_failure(db, job)
+        else:
+            await self._finish(job, status="done", last_error=None)
+            self.outcomes["done"] += 1
+
+    async def _run_job(self, job: Job) -> None:
+        try:
+            await self._execute(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Job %s (%s) could not be recorded", job.id, job.kind)
+        finally:
+            self._running.pop(job.id, None)
+            self.notify()
+
+    async def _tick(self) -> None:
+        if time.monotonic() - self._maintained_at >= self.poll_interval:
+            self._maintained_at = time.monotonic()
+            await self._maintain()
+        free = self.concurrency - len(self._running)
+        if free <= 0 or self._stopping:
+            return
+        for job in await self._claim(free):
+            self._running[job.id] = asyncio.create_task(self._run_job(job))
+
+    async def _run(self, wakeup: asyncio.Event) -> None:
+        while not self._stopping:
+            wakeup.clear()
+            try:
+                await self._tick()
+            except Exception:
+                logger.exception("Job queue poll failed")
+            try:
+                await asyncio.wait_for(wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self) -> None:
+        # Event привязан к циклу, в котором его ждут
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(self._wakeup))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            # Текущий проход доводим до конца: отмена посреди запроса ломает соединение пула
+            self._stopping = True
+            self.notify()
+            await self._task
+            self._task = None
+        interrupted = list(self._running)
+        for task in list(self._running.values()):
+            task.cancel()
+        await asyncio.gather(*self._running.values(), return_exceptions=True)
+        self._running.clear()
+        if interrupted:
+            # Прерванная остановкой попытка не считается неудачной
+            async with SessionLocal() as db:
+                await db.execute(update(Job).where(Job.id.in_(interrupted), Job.locked_by == self.origin)
+                                 .values(status="pending", locked_by=None, locked_at=None,
+                                         attempts=Job.attempts - 1))
+                await db.commit()
+
+    async def stats(self, db: AsyncSession) -> dict:
+        result = await db.execute(select(Job.status, func.count()).group_by(Job.status))
+        return {"jobs": dict(result.all()),
+                "running_here": len(self._running),
+                "concurrency": self.concurrency,
+                "outcomes": dict(self.outcomes)}
+
+
+job_queue = JobQueue()
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from app.config import LOOP_STALL_THRESHOLD_SECONDS, LOOP_STALL_CHECK_INTERVAL_SECONDS
+from app.utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+
+class LoopStallDetector:
+    """Watches the event loop for blocking calls.
+
+    A task on the loop wakes up every ``interval`` and records how late it was (the
+    loop lag). A watchdog thread checks that heartbeat; when the loop has not answered
+    for longer than ``threshold`` it logs a warning with the stack the loop thread is
+    stuck in, while the stall is still happening.
+    """
+
+    def __init__(self, interval: float = LOOP_STALL_CHECK_INTERVAL_SECONDS,
+                 threshold: float = LOOP_STALL_THRESHOLD_SECONDS):
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = Histogram()
+        self.stalls = 0
+        self.longest_stall_seconds = 0.0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            self._heartbeat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - started - self.interval, 0.0)
+            self.lag.observe(lag)
+            if lag > self.threshold:
+                self.stalls += 1
+                self.longest_stall_seconds = max(self.longest_stall_seconds, lag)
+
+    def _watch(self) -> None:
+        reported = None
+        while not self._stopped.wait(self.interval):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked <= self.threshold or reported == heartbeat:
+                continue
+            # Один раз на каждую остановку, со стеком, в котором она застряла
+            reported = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<unknown>"
+            logger.warning("Event loop blocked for %.0f ms, currently in:\n%s", blocked * 1000, stack)
+
+    async def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._run())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-stall-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._watchdog = None
+
+    def stats(self) -> dict:
+        return {"threshold_seconds": self.threshold,
+                "stalls": self.stalls,
+                "longest_stall_seconds": self.longest_stall_seconds,
+                "lag": self.lag.stats()}
+
+
+loop_stall_detector = LoopStallDetector()
@@ -0,0 +1,162 @@
+import bisect
+import threading
+
+# Границы корзин в секундах: от долей миллисекунды до медленного диска/сети
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; cheap enough to observe on every call."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """``(upper bound, observations <= bound)`` pairs, ending with ``+inf``."""
+        total, result = 0, []
+        for bound, count in zip(self.buckets + (float("inf"),), self._counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation (``max`` for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def stats(self) -> dict:
+        return {"count": self.count,
+                "avg_seconds": self.sum / self.count if self.count else 0.0,
+                "p50_seconds": self.quantile(0.5),
+                "p99_seconds": self.quantile(0.99),
+                "max_seconds": self.max}
+
+
+# Метрики в текстовом формате Prometheus (без зависимости от prometheus_client)
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self):
+        """``(sample name, label pairs, value)`` for every series of the metric."""
+        raise NotImplementedError
+
+    def expose(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for name, labels, value in self.samples())
+        return lines
+
+
+class CounterMetric(Metric):
+    """Counter updated by the app, or read from ``function`` at scrape time for values kept elsewhere."""
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), function=None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, *labelvalues) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        if self.function is not None:
+            yield self.name, (), self.function()
+            return
+        for labelvalues, value in sorted(self._values.items()):
+            yield self.name, tuple(zip(self.labelnames, labelvalues)), value
+
+
+class GaugeMetric(CounterMetric):
+    type = "gauge"
+
+    def set(self, value: float, *labelvalues) -> None:
+        self._values[labelvalues] = value
+
+    def dec(self, amount: float = 1, *labelvalues) -> None:
+        self.inc(-amount, *labelvalues)
+
+
+class HistogramMetric(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        self._histograms: dict[tuple, Histogram] = {}
+
+    def labels(self, *labelvalues) -> Histogram:
+        histogram = self._histograms.get(labelvalues)
+        if histogram is None:
+            histogram = self._histograms[labelvalues] = Histogram(self.buckets)
+        return histogram
+
+    def observe(self, value: float, *labelvalues) -> None:
+        self.labels(*labelvalues).observe(value)
+
+    def samples(self):
+        for labelvalues, histogram in sorted(self._histograms.items()):
+            labels = tuple(zip(self.labelnames, labelvalues))
+            for bound, count in histogram.cumulative():
+                yield f"{self.name}_bucket", labels + (("le", _format_value(bound)),), count
+            yield f"{self.name}_sum", labels, histogram.sum
+            yield f"{self.name}_count", labels, histogram.count
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def expose(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
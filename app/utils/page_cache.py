@@ -0,0 +1,114 @@
+import hashlib
+import uuid
+from typing import Hashable
+
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.config import PAGE_CACHE_SIZE, PAGE_CACHE_TTL_SECONDS, PAGE_CACHE_MAX_ENTRY_BYTES
+from app.dependencies import templates
+from app.utils.cache import TTLCache
+from app.utils.downloads import etag_values
+from app.utils.shared_state import shared_state
+
+
+class PageCache:
+    """Rendered pages and fragments keyed by a data version.
+
+    Every change to files calls ``bump``: keys built afterwards carry the new version,
+    so anything rendered from older data is never served again, and the old entries
+    are dropped at once; the other workers are told to do the same. Listings also show
+    download counts, so their keys (``listing_key``) carry a second version that
+    ``bump_listings`` advances without touching the other pages. Entries larger than
+    ``max_entry_bytes`` are not kept, so memory stays below ``maxsize * max_entry_bytes``.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, max_entry_bytes: int):
+        # Эпоха отличает ETag'и разных запусков процесса с одинаковой версией
+        self.epoch = uuid.uuid4().hex[:8]
+        self.version = 0
+        self.listing_version = 0
+        self.max_entry_bytes = max_entry_bytes
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.too_large = 0
+
+    def bump(self) -> None:
+        self._bump_local()
+        shared_state.publish("page_cache")
+
+    def _bump_local(self, message: str = "") -> None:
+        self.version += 1
+        self._cache.clear()
+
+    def bump_listings(self) -> None:
+        self._bump_listings_local()
+        shared_state.publish("page_cache_listings")
+
+    def _bump_listings_local(self, message: str = "") -> None:
+        self.listing_version += 1
+        self._cache.discard_where(lambda key: key[1] == "listing")
+
+    def key(self, *parts: Hashable) -> tuple:
+        return (self.version, *parts)
+
+    def listing_key(self, *parts: Hashable) -> tuple:
+        return (self.version, "listing", self.listing_version, *parts)
+
+    def etag(self, key: tuple) -> str:
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+        return f'W/"{self.epoch}-{key[0]}-{digest}"'
+
+    @property
+    def hits(self) -> int:
+        return self._cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self._cache.misses
+
+    def get(self, key: tuple):
+        return self._cache.get(key)
+
+    def set(self, key: tuple, value: str | bytes) -> None:
+        if len(value) > self.max_entry_bytes:
+            self.too_large += 1
+            return
+        self._cache.set(key, value)
+
+    def stats(self) -> dict:
+        return {"version": self.version, "listing_version": self.listing_version, "too_large": self.too_large, **self._cache.stats()}
+
+
+def is_fresh(request_headers: Headers, etag: str) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag.removeprefix("W/") in etag_values(if_none_match)
+
+
+def cached_response(body: bytes | None, etag: str, media_type: str = "text/html") -> Response:
+    """Response for a cached body; ``None`` gives an empty 304 with the same validators."""
+    # Страница зависит от cookie пользователя, поэтому только private и с перепроверкой
+    headers = {"etag": etag, "cache-control": "private, no-cache", "vary": "Cookie"}
+    if body is None:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type=media_type, headers=headers)
+
+
+def render_page(request: Request, template: str, context: dict, *key: Hashable) -> Response:
+    """Cached replacement for ``TemplateResponse`` on pages whose output depends only on ``key``."""
+    key = page_cache.key("page", template, *key)
+    etag = page_cache.etag(key)
+    if is_fresh(request.headers, etag):
+        return cached_response(None, etag)
+    body = page_cache.get(key)
+    if body is None:
+        body = templates.get_template(template).render({"request": request, **context}).encode()
+        page_cache.set(key, body)
+    return cached_response(body, etag)
+
+
+page_cache = PageCache(PAGE_CACHE_SIZE, PAGE_CACHE_TTL_SECONDS, PAGE_CACHE_MAX_ENTRY_BYTES)
+shared_state.subscribe("page_cache", page_cache._bump_local)
+shared_state.subscribe("page_cache_listings", page_cache._bump_listings_local)
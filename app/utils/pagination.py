@@ -0,0 +1,102 @@
+import base64
+import json
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+# sort -> (колонка модели, по убыванию)
+SORT_OPTIONS = {
+    "id": ("id", False),
+    "-id": ("id", True),
+    "upload_count": ("upload_count", False),
+    "-upload_count": ("upload_count", True),
+}
+
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if not isinstance(values, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return values
+
+
+def prefix_upper_bound(prefix: str) -> str | None:
+    """Smallest string greater than every string starting with ``prefix``, for an index range scan."""
+    while prefix:
+        last = ord(prefix[-1])
+        if last < 0x10FFFF:
+            # Суррогаты в UTF-8 не кодируются, следующий за ними символ - U+E000
+            return prefix[:-1] + chr(0xE000 if 0xD800 <= last + 1 <= 0xDFFF else last + 1)
+        prefix = prefix[:-1]
+    return None
+
+
+class bytewise(ColumnElement):
+    """A string column compared by code point: ``COLLATE "C"`` on Postgres, as is on SQLite (BINARY already)."""
+
+    inherit_cache = True
+    _traverse_internals = [("column", InternalTraversal.dp_clauseelement)]
+
+    def __init__(self, column):
+        self.column = column
+        self.type = column.type
+
+
+@compiles(bytewise)
+def _compile_bytewise(element, compiler, **kw):
+    return compiler.process(element.column, **kw)
+
+
+@compiles(bytewise, "postgresql")
+def _compile_bytewise_postgresql(element, compiler, **kw):
+    return f'{compiler.process(element.column, **kw)} COLLATE "C"'
+
+
+def prefix_conditions(column, prefix: str) -> list:
+    """``column`` starts with ``prefix``, as a range the index can scan.
+
+    The range means "starts with" only under code point order; with a linguistic collation
+    (Postgres ``en_US.UTF-8``) it would also take in ``Abc`` or ``a_b`` for ``ab``, hence ``bytewise``.
+    """
+    conditions = [bytewise(column) >= prefix]
+    upper = prefix_upper_bound(prefix)
+    if upper is not None:
+        conditions.append(bytewise(column) < upper)
+    return conditions
+
+
+def keyset_paginate(query, model, sort: str, cursor: str | None, limit: int):
+    """Order ``query`` by the sort column plus ``id`` and continue after ``cursor``."""
+    if sort not in SORT_OPTIONS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"sort must be one of {', '.join(SORT_OPTIONS)}")
+    column_name, descending = SORT_OPTIONS[sort]
+    columns = [getattr(model, column_name)] if column_name == "id" else [getattr(model, column_name), model.id]
+
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(columns):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        key = tuple_(*columns) if len(columns) > 1 else columns[0]
+        bound = tuple_(*values) if len(values) > 1 else values[0]
+        query = query.where(key < bound if descending else key > bound)
+
+    order = [column.desc() if descending else column.asc() for column in columns]
+    return query.order_by(*order).limit(limit + 1), [column.key for column in columns]
+
+
+def next_cursor(rows: list, key_names: list[str], limit: int) -> str | None:
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor([last[name] for name in key_names])
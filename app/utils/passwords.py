@@ -0,0 +1,85 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.config import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE
+
+
+class PasswordHasher:
+    """Runs bcrypt in a dedicated, bounded thread pool so it never blocks the event loop.
+
+    bcrypt releases the GIL while hashing, so threads give real parallelism here.
+    Requests beyond ``max_queue`` waiting calls are rejected with 503 instead of
+    piling up behind a login storm.
+    """
+
+    def __init__(self, context: CryptContext, workers: int, max_queue: int):
+        self.context = context
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.pending = 0
+        self.max_pending = 0
+        self.calls = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    @property
+    def in_flight(self) -> int:
+        return min(self.pending, self.workers)
+
+    @property
+    def queued(self) -> int:
+        return max(self.pending - self.workers, 0)
+
+    async def _run(self, fn, *args):
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Too many concurrent logins, try again later",
+                                headers={"Retry-After": "1"})
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            return started, fn(*args), time.perf_counter() - started
+
+        try:
+            started, result, run_seconds = await asyncio.get_running_loop().run_in_executor(self._executor, job)
+        finally:
+            self.pending -= 1
+        self.calls += 1
+        self.total_wait_seconds += started - submitted
+        self.total_run_seconds += run_seconds
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(self.context.verify, password, hashed)
+
+    async def verify_and_update(self, password: str, hashed: str) -> tuple[bool, str | None]:
+        """Verify and, if the stored hash uses outdated settings, return a fresh hash as well."""
+        return await self._run(self.context.verify_and_update, password, hashed)
+
+    def stats(self) -> dict:
+        return {"workers": self.workers,
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "max_queued": max(self.max_pending - self.workers, 0),
+                "max_queue": self.max_queue,
+                "calls": self.calls,
+                "rejected": self.rejected,
+                "avg_wait_seconds": self.total_wait_seconds / self.calls if self.calls else 0.0,
+                "avg_run_seconds": self.total_run_seconds / self.calls if self.calls else 0.0}
+
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+password_hasher = PasswordHasher(pwd_context, workers=PASSWORD_HASH_WORKERS, max_queue=PASSWORD_HASH_MAX_QUEUE)
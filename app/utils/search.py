@@ -0,0 +1,160 @@
+import math
+
+from sqlalchemy import Float, case, cast, column, func, literal_column, or_, select, table, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import File, User
+from app.utils.pagination import bytewise, prefix_conditions
+
+# Веса колонок files_fts (filename, owner, description, tags) для bm25: имя файла важнее всего
+FTS_WEIGHTS = (10.0, 2.0, 1.0, 4.0)
+MIN_TERM_LENGTH = 3
+# Доля триграмм запроса, которые должны найтись в тексте при поиске с опечатками на SQLite. Postgres
+# (%>, порог 0.6) считает и триграммы с пробелами по краям слов, поэтому у него порог выше при той же строгости
+FUZZY_MIN_SHARED_TRIGRAMS = 0.5
+SEARCH_MODES = ("prefix", "exact", "fuzzy")
+
+# Выражение должно совпадать с индексом ix_files_search_trgm, иначе Postgres его не использует
+SEARCH_DOCUMENT_SQL = "lower(filename || ' ' || coalesce(description, '') || ' ' || coalesce(tags, ''))"
+
+SQLITE_INDEX_DDL = (
+    "CREATE VIRTUAL TABLE files_fts USING fts5(filename, owner, description, tags, tokenize='trigram')",
+    """CREATE TRIGGER IF NOT EXISTS files_fts_insert AFTER INSERT ON files BEGIN
+        INSERT INTO files_fts (rowid, filename, owner, description, tags)
+        VALUES (new.id, new.filename, (SELECT username FROM users WHERE id = new.owner_id),
+                new.description, new.tags);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS files_fts_update AFTER UPDATE OF filename, owner_id, description, tags ON files
+    BEGIN
+        DELETE FROM files_fts WHERE rowid = old.id;
+        INSERT INTO files_fts (rowid, filename, owner, description, tags)
+        VALUES (new.id, new.filename, (SELECT username FROM users WHERE id = new.owner_id),
+                new.description, new.tags);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS files_fts_delete AFTER DELETE ON files BEGIN
+        DELETE FROM files_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS files_fts_owner AFTER UPDATE OF username ON users BEGIN
+        UPDATE files_fts SET owner = new.username WHERE rowid IN (SELECT id FROM files WHERE owner_id = new.id);
+    END""",
+    """INSERT INTO files_fts (rowid, filename, owner, description, tags)
+       SELECT files.id, files.filename, users.username, files.description, files.tags
+       FROM files LEFT JOIN users ON users.id = files.owner_id""",
+)
+# Для фильтра по префиксу (pagination.prefix_conditions): сравнение в COLLATE "C" берёт только такой индекс
+FILENAME_BYTEWISE_INDEX_DDL = 'CREATE INDEX IF NOT EXISTS ix_files_filename_c ON files (filename COLLATE "C")'
+POSTGRES_INDEX_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_files_search_trgm ON files USING gin (({SEARCH_DOCUMENT_SQL}) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_username_trgm ON users USING gin (lower(username) gin_trgm_ops)",
+    FILENAME_BYTEWISE_INDEX_DDL,
+)
+
+fts = table("files_fts", column("rowid"))
+
+
+def create_search_index(connection: Connection) -> None:
+    """Create the search index for the connection's database if it is missing; existing rows are indexed.
+
+    SQLite keeps an FTS5 trigram table in step with ``files`` through triggers, so every
+    INSERT/UPDATE/DELETE (bulk ones included) updates the index in the same transaction.
+    Postgres indexes the rows themselves with pg_trgm GIN indexes.
+    """
+    if connection.dialect.name == "sqlite":
+        exists = connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'files_fts'")).first()
+        if not exists:
+            for statement in SQLITE_INDEX_DDL:
+                connection.execute(text(statement))
+    elif connection.dialect.name == "postgresql":
+        for statement in POSTGRES_INDEX_DDL:
+            connection.execute(text(statement))
+
+
+def drop_search_index(connection: Connection) -> None:
+    if connection.dialect.name == "sqlite":
+        for trigger in ("files_fts_insert", "files_fts_update", "files_fts_delete", "files_fts_owner"):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+        connection.execute(text("DROP TABLE IF EXISTS files_fts"))
+    elif connection.dialect.name == "postgresql":
+        connection.execute(text("DROP INDEX IF EXISTS ix_users_username_trgm"))
+        connection.execute(text("DROP INDEX IF EXISTS ix_files_search_trgm"))
+        connection.execute(text("DROP INDEX IF EXISTS ix_files_filename_c"))
+
+
+def search_terms(q: str) -> list[str]:
+    return list(dict.fromkeys(q.lower().split()))
+
+
+def trigrams(term: str) -> set[str]:
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+def fts_string(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+
+def apply_search(query, dialect: str, q: str, mode: str, ranked: bool = True):
+    """Restrict a query over ``files`` to the matches of ``q``; returns it with its ordering key columns.
+
+    ``prefix``: filename starts with ``q`` (terms too short for trigrams), ordered by filename.
+    ``exact``: every term occurs in the filename, owner, description or tags.
+    ``fuzzy``: the text shares enough trigrams with ``q`` to survive typos; on SQLite at least
+    ``FUZZY_MIN_SHARED_TRIGRAMS`` of them, on Postgres ``%>`` with its word similarity threshold.
+    Ranked results are ordered by relevance score (lower is better), then id; unranked by id only.
+    """
+    if mode == "prefix":
+        # Порядок и курсор в том же побайтовом сравнении, что и фильтр: так их отдаёт индекс
+        return query.where(*prefix_conditions(File.filename, q.strip())), (bytewise(File.filename),)
+
+    terms = [term for term in search_terms(q) if len(term) >= MIN_TERM_LENGTH]
+    if dialect == "sqlite":
+        grams = sorted(set().union(*map(trigrams, terms)))
+        if mode == "fuzzy":
+            expression = " OR ".join(fts_string(t) for t in grams)
+        else:
+            # Триграммный токенизатор: строка в кавычках ищется как подстрока
+            expression = " AND ".join(fts_string(term) for term in terms)
+        query = (query.join(fts, fts.c.rowid == File.id)
+                 .where(literal_column("files_fts").op("MATCH")(expression)))
+        if mode == "fuzzy":
+            # OR по индексу даёт кандидатов, а одной общей триграммы мало: считаем, сколько их у каждого
+            shared = sum(case((fts.c.rowid.in_(select(fts.c.rowid).correlate(None)
+                                               .where(literal_column("files_fts").op("MATCH")(fts_string(t)))), 1),
+                              else_=0)
+                         for t in grams)
+            query = query.where(shared >= math.ceil(len(grams) * FUZZY_MIN_SHARED_TRIGRAMS))
+        # FTS5 отдаёт совпадения по возрастанию rowid, так что без ранжирования сортировка бесплатная
+        if not ranked:
+            return query, (fts.c.rowid,)
+        return query, (func.bm25(literal_column("files_fts"), *FTS_WEIGHTS), fts.c.rowid)
+
+    # Имена колонок без таблицы однозначны: у users нет filename, description и tags
+    document = literal_column(SEARCH_DOCUMENT_SQL)
+    owner = func.lower(User.username)
+
+    def owned_by(condition):
+        # Подзапрос, а не OR по JOIN: так оба условия идут по индексам таблицы files
+        return File.owner_id.in_(select(User.id).where(condition))
+
+    if mode == "fuzzy":
+        query = query.where(or_(document.op("%>")(q.lower()), owned_by(owner.op("%>")(q.lower()))))
+    else:
+        # Шаблон целиком одним параметром, а не '%' || term || '%': так планировщик берёт триграммный индекс
+        patterns = ["%" + term.replace("/", "//").replace("%", "/%").replace("_", "/_") + "%" for term in terms]
+        query = query.where(*(or_(document.like(pattern, escape="/"), owned_by(owner.like(pattern, escape="/")))
+                              for pattern in patterns))
+    if not ranked:
+        return query, (File.id,)
+    # Владелец для оценки берётся из JOIN users, который есть в запросе списка файлов
+    score = -cast(func.word_similarity(q.lower(), func.lower(File.filename)) * 2
+                  + func.word_similarity(q.lower(), document)
+                  + func.word_similarity(q.lower(), func.coalesce(owner, "")) * 0.5, Float)
+    return query, (score, File.id)
+
+
+async def count_matches(db: AsyncSession, q: str, mode: str, limit: int) -> int:
+    """Number of matches, counted only up to ``limit + 1``: enough to decide whether to rank them."""
+    query, _ = apply_search(select(File.id), db.bind.dialect.name, q, mode, ranked=False)
+    result = await db.execute(select(func.count()).select_from(query.limit(limit + 1).subquery()))
+    return result.scalar_one()
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from app.config import SHARED_STATE_BACKEND, SHARED_STATE_PATH, SHARED_STATE_POLL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class SharedState:
+    """State shared by all worker processes: invalidation broadcasts and counters.
+
+    ``publish`` and ``incr`` never block the caller; backends deliver them to the
+    other workers in the background. ``publish`` does not call the local
+    subscribers: the publisher has already applied the change to itself.
+    """
+
+    def __init__(self):
+        self._subscribers: defaultdict[str, list[Callable[[str], None]]] = defaultdict(list)
+        self._counters: Counter[str] = Counter()
+
+    def subscribe(self, channel: str, callback: Callable[[str], None]) -> None:
+        self._subscribers[channel].append(callback)
+
+    def publish(self, channel: str, message: str = "") -> None:
+        pass
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        self._counters[name] += amount
+
+    def counter(self, name: str) -> int:
+        """Value of a counter summed over all workers (as of the last sync)."""
+        return self._counters[name]
+
+    def _dispatch(self, channel: str, message: str) -> None:
+        for callback in self._subscribers.get(channel, ()):
+            try:
+                callback(message)
+            except Exception:
+                logger.exception("Shared state subscriber for %r failed", channel)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "counters": dict(self._counters)}
+
+
+class MemorySharedState(SharedState):
+    """Single process: nobody else to tell."""
+
+
+class SQLiteSharedState(SharedState):
+    """Workers on one host exchange messages and counters through a local SQLite file.
+
+    Outgoing messages and counter increments are buffered in memory and written
+    every ``poll_interval`` seconds in one transaction, which also picks up the
+    messages of the other workers; SQLite's file locking serialises the writers.
+    """
+
+    EVENT_RETENTION_SECONDS = 60
+
+    def __init__(self, path: str, poll_interval: float):
+        super().__init__()
+        self.path = path
+        self.poll_interval = poll_interval
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._outbox: list[tuple[str, str]] = []
+        self._pending: Counter[str] = Counter()
+        self._totals: dict[str, int] = {}
+        # Соединение sqlite3 живёт в одном потоке
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-state")
+        self._connection: sqlite3.Connection | None = None
+        self._last_event_id = 0
+        self._task: asyncio.Task | None = None
+        self.syncs = 0
+        self.failed_syncs = 0
+        self.received = 0
+
+    def publish(self, channel: str, message: str = "") -> None:
+        self._outbox.append((channel, message))
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        self._pending[name] += amount
+
+    def counter(self, name: str) -> int:
+        return self._totals.get(name, 0) + self._pending[name]
+
+    def _open(self) -> None:
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                           "channel TEXT NOT NULL, message TEXT NOT NULL, origin TEXT NOT NULL, "
+                           "created_at REAL NOT NULL)")
+        connection.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        # Старые сообщения не проигрываем: кэши нового воркера и так пусты
+        self._last_event_id = connection.execute("SELECT coalesce(max(id), 0) FROM events").fetchone()[0]
+        self._connection = connection
+
+    def _sync(self, outbox: list[tuple[str, str]], increments: Counter) -> tuple[list[tuple[str, str]], dict]:
+        connection = self._connection
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany("INSERT INTO events (channel, message, origin, created_at) VALUES (?, ?, ?, ?)",
+                                   [(channel, message, self.origin, now) for channel, message in outbox])
+            connection.executemany("INSERT INTO counters (name, value) VALUES (?, ?) "
+                                   "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                                   list(increments.items()))
+            connection.execute("DELETE FROM events WHERE created_at < ?", (now - self.EVENT_RETENTION_SECONDS,))
+            rows = connection.execute("SELECT id, channel, message, origin FROM events WHERE id > ? ORDER BY id",
+                                      (self._last_event_id,)).fetchall()
+            totals = dict(connection.execute("SELECT name, value FROM counters").fetchall())
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        if rows:
+            self._last_event_id = rows[-1][0]
+        return [(channel, message) for _, channel, message, origin in rows if origin != self.origin], totals
+
+    async def sync(self) -> None:
+        outbox, self._outbox = self._outbox, []
+        increments, self._pending = self._pending, Counter()
+        try:
+            events, totals = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._sync, outbox, increments)
+        except Exception:
+            # Не теряем ничего: отправим при следующей синхронизации
+            self._outbox[:0] = outbox
+            self._pending.update(increments)
+            self.failed_syncs += 1
+            raise
+        self.syncs += 1
+        self._totals = totals
+        self.received += len(events)
+        for channel, message in events:
+            self._dispatch(channel, message)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.sync()
+            except Exception:
+                logger.exception("Shared state sync failed")
+
+    async def start(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._open)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._connection is not None:
+            await self.sync()
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._connection.close)
+            self._connection = None
+
+    def stats(self) -> dict:
+        return {"backend": "sqlite",
+                "path": self.path,
+                "origin": self.origin,
+                "syncs": self.syncs,
+                "failed_syncs": self.failed_syncs,
+                "received": self.received,
+                "outbox": len(self._outbox),
+                "counters": {name: self.counter(name) for name in sorted(set(self._totals) | set(self._pending))}}
+
+
+def create_shared_state() -> SharedState:
+    if SHARED_STATE_BACKEND == "memory":
+        return MemorySharedState()
+    if SHARED_STATE_BACKEND == "sqlite":
+        return SQLiteSharedState(SHARED_STATE_PATH, SHARED_STATE_POLL_SECONDS)
+    raise RuntimeError(f"Unknown SHARED_STATE_BACKEND {SHARED_STATE_BACKEND!r}")
+
+
+shared_state = create_shared_state()
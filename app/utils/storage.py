@@ -0,0 +1,230 @@
+import asyncio
+import os
+from collections import Counter
+from contextlib import AsyncExitStack, asynccontextmanager
+from urllib.parse import quote
+
+from sqlalchemy import false, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.config import (STORAGE_BACKEND, STORAGE_ROOT, S3_BUCKET, S3_PREFIX, S3_ENDPOINT_URL,
+                        S3_URL_EXPIRE_SECONDS)
+from app.models import File
+from app.utils.compression import is_compressible, write_gzip_variant
+from app.utils.fs import fs
+from app.utils.uploads import StagedUpload, discard_upload
+
+VARIANT_SUFFIXES = {"gzip": ".gz"}
+
+
+def blob_key(content_hash: str) -> str:
+    """Sharded location of a blob: ``ab/cd/abcd...`` keeps directories small."""
+    return f"{content_hash[:2]}/{content_hash[2:4]}/{content_hash}"
+
+
+class Storage:
+    """Content-addressed blob store: blobs are keyed by their SHA-256 and shared by all files with that content.
+
+    ``put`` and ``delete`` for the same hash must run under ``lock(hash)`` together with the
+    database change that adds or removes the referencing ``File`` row, so a blob is never
+    removed while a new reference to it is being committed. ``lock`` only covers one process;
+    the transaction must also call ``lock_references``, which other worker processes respect.
+    """
+
+    def __init__(self):
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._lock_users: Counter[str] = Counter()
+
+    @asynccontextmanager
+    async def lock(self, content_hash: str):
+        lock = self._locks.setdefault(content_hash, asyncio.Lock())
+        self._lock_users[content_hash] += 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_users[content_hash] -= 1
+            if not self._lock_users[content_hash]:
+                del self._lock_users[content_hash]
+                del self._locks[content_hash]
+
+    @asynccontextmanager
+    async def lock_many(self, content_hashes):
+        """Hold ``lock`` for several hashes at once; taken in sorted order so batches never deadlock."""
+        async with AsyncExitStack() as stack:
+            for content_hash in sorted(set(content_hashes)):
+                await stack.enter_async_context(self.lock(content_hash))
+            yield
+
+    def location(self, content_hash: str) -> str:
+        """Value stored in ``File.path`` for a blob."""
+        raise NotImplementedError
+
+    def local_path(self, content_hash: str) -> str | None:
+        """Filesystem path to serve the blob from, or None if it has to be fetched by URL."""
+        return None
+
+    async def url(self, content_hash: str, filename: str) -> str:
+        raise NotImplementedError
+
+    async def exists(self, content_hash: str) -> bool:
+        raise NotImplementedError
+
+    async def put(self, staged: StagedUpload) -> bool:
+        """Store a staged upload under its hash; returns False if the blob was already there."""
+        raise NotImplementedError
+
+    async def delete(self, content_hash: str) -> None:
+        raise NotImplementedError
+
+    def variant_path(self, content_hash: str, encoding: str) -> str | None:
+        """Local path of a precompressed variant of the blob, if the backend keeps them."""
+        return None
+
+    async def create_variants(self, content_hash: str, filename: str) -> None:
+        """Precompress the blob for encodings clients can negotiate; a no-op by default."""
+
+
+async def lock_references(db: AsyncSession, content_hashes) -> None:
+    """Serialise, across worker processes, transactions that add or check references to these blobs.
+
+    Held until ``db`` commits or rolls back. A transaction that re-checks references before
+    deleting a blob must keep it until the blob is gone; one that adds a ``File`` row takes it
+    before committing, so the row is either seen by the check or committed after the delete.
+    """
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        for content_hash in sorted(set(content_hashes)):
+            # Ключ advisory-блокировки - bigint: первые 60 бит хеша
+            await db.execute(select(func.pg_advisory_xact_lock(int(content_hash[:15], 16))))
+    elif dialect == "sqlite":
+        # Писатель в SQLite один на всю базу: пустой UPDATE сразу берёт блокировку записи до конца транзакции
+        await db.execute(update(File).where(false()).values(content_hash=File.content_hash)
+                         .execution_options(synchronize_session=False))
+
+
+class LocalStorage(Storage):
+    def __init__(self, root: str):
+        super().__init__()
+        self.root = root
+
+    def location(self, content_hash: str) -> str:
+        return os.path.join(self.root, blob_key(content_hash))
+
+    def local_path(self, content_hash: str) -> str | None:
+        return self.location(content_hash)
+
+    async def exists(self, content_hash: str) -> bool:
+        return await fs.exists(self.location(content_hash))
+
+    def _put(self, temp_path: str, path: str) -> bool:
+        if os.path.exists(path):
+            os.remove(temp_path)
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+        return True
+
+    async def put(self, staged: StagedUpload) -> bool:
+        return await fs.run("rename", self._put, staged.temp_path, self.location(staged.content_hash))
+
+    def variant_path(self, content_hash: str, encoding: str) -> str | None:
+        suffix = VARIANT_SUFFIXES.get(encoding)
+        return self.location(content_hash) + suffix if suffix else None
+
+    async def create_variants(self, content_hash: str, filename: str) -> None:
+        if not is_compressible(filename):
+            return
+        try:
+            await fs.run("compress", write_gzip_variant, self.location(content_hash),
+                         self.variant_path(content_hash, "gzip"))
+        except FileNotFoundError:
+            pass
+
+    def _delete(self, path: str) -> None:
+        for suffix in VARIANT_SUFFIXES.values():
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        # Пустые каталоги шардов убираем, корень оставляем
+        for directory in (os.path.dirname(path), os.path.dirname(os.path.dirname(path))):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+
+    async def delete(self, content_hash: str) -> None:
+        await fs.run("remove", self._delete, self.location(content_hash))
+
+
+class S3Storage(Storage):
+    """Blobs in an S3-compatible bucket (AWS, MinIO, ...) through a boto3-style client.
+
+    ``client`` can be any object with boto3's ``head_object``, ``upload_file``,
+    ``delete_object`` and ``generate_presigned_url`` methods, e.g. one pointed at a
+    local MinIO or moto server.
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: str | None = None, client=None):
+        super().__init__()
+        if client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError("STORAGE_BACKEND=s3 requires the boto3 package")
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def key(self, content_hash: str) -> str:
+        return self.prefix + blob_key(content_hash)
+
+    def location(self, content_hash: str) -> str:
+        return f"s3://{self.bucket}/{self.key(content_hash)}"
+
+    async def url(self, content_hash: str, filename: str) -> str:
+        params = {"Bucket": self.bucket, "Key": self.key(content_hash),
+                  "ResponseContentDisposition": f"attachment; filename*=utf-8''{quote(filename)}"}
+        return await run_in_threadpool(self.client.generate_presigned_url, "get_object",
+                                       Params=params, ExpiresIn=S3_URL_EXPIRE_SECONDS)
+
+    def _exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except Exception as exc:
+            if getattr(exc, "response", {}).get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    async def exists(self, content_hash: str) -> bool:
+        return await run_in_threadpool(self._exists, self.key(content_hash))
+
+    async def put(self, staged: StagedUpload) -> bool:
+        key = self.key(staged.content_hash)
+        try:
+            if await run_in_threadpool(self._exists, key):
+                return False
+            await run_in_threadpool(self.client.upload_file, staged.temp_path, self.bucket, key)
+            return True
+        finally:
+            await discard_upload(staged)
+
+    async def delete(self, content_hash: str) -> None:
+        await run_in_threadpool(self.client.delete_object, Bucket=self.bucket, Key=self.key(content_hash))
+
+
+def create_storage() -> Storage:
+    if STORAGE_BACKEND == "local":
+        return LocalStorage(STORAGE_ROOT)
+    if STORAGE_BACKEND == "s3":
+        return S3Storage(S3_BUCKET, prefix=S3_PREFIX, endpoint_url=S3_ENDPOINT_URL)
+    raise RuntimeError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}")
+
+
+storage = create_storage()
@@ -0,0 +1,327 @@
+import asyncio
+import datetime
+import hashlib
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from typing import AsyncIterator, BinaryIO
+
+from fastapi import HTTPException, Request, status
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from sqlalchemy import delete
+from sqlalchemy.future import select
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import (UPLOAD_FOLDER, UPLOAD_CHUNK_SIZE, MAX_UPLOAD_SIZE, MAX_FORM_FIELD_SIZE,
+                        UPLOAD_SESSION_TTL_SECONDS, UPLOAD_SESSION_GC_INTERVAL_SECONDS)
+from app.database import SessionLocal
+from app.models import UploadSession, UploadChunk
+from app.utils.fs import fs
+
+logger = logging.getLogger(__name__)
+
+SESSIONS_FOLDER = os.path.join(UPLOAD_FOLDER, ".sessions")
+
+
+@dataclass
+class StagedUpload:
+    temp_path: str
+    size: int
+    content_hash: str
+
+
+def _open_temp(directory: str, name: str = None):
+    os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".upload-{uuid.uuid4().hex}.part" if name is None else name)
+    return temp_path, open(temp_path, "wb")
+
+
+def _write_chunk(f, hasher, chunk: bytes) -> None:
+    hasher.update(chunk)
+    f.write(chunk)
+
+
+def _finish(f) -> None:
+    f.flush()
+    os.fsync(f.fileno())
+    f.close()
+
+
+def _discard(f, temp_path: str) -> None:
+    f.close()
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+
+async def stage_stream(chunks: AsyncIterator[bytes],
+                       directory: str = UPLOAD_FOLDER,
+                       max_size: int = MAX_UPLOAD_SIZE,
+                       name: str = None) -> StagedUpload:
+    """Write an async stream of chunks into a temp file, hashing it on the way."""
+    temp_path, f = await fs.run("open", _open_temp, directory, name)
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            size += len(chunk)
+            if size > max_size:
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                    detail="File is too large")
+            await fs.run("write", _write_chunk, f, hasher, chunk)
+        await fs.run("fsync", _finish, f)
+    except BaseException:
+        await fs.run("remove", _discard, f, temp_path)
+        raise
+    return StagedUpload(temp_path=temp_path, size=size, content_hash=hasher.hexdigest())
+
+
+@dataclass
+class StagedForm:
+    fields: dict[str, str]
+    files: list[tuple[str, str, StagedUpload]]  # (field name, filename, staged upload)
+
+    def files_of(self, field: str) -> list[tuple[str, StagedUpload]]:
+        return [(filename, staged) for name, filename, staged in self.files if name == field]
+
+    async def discard(self, keep: list[StagedUpload] = ()) -> None:
+        await asyncio.gather(*(discard_upload(staged) for _, _, staged in self.files if staged not in keep))
+
+
+@dataclass
+class _FormPart:
+    name: str
+    filename: str | None
+    value: bytearray | None = None
+    file: BinaryIO | None = None
+    temp_path: str | None = None
+    hasher: object = None
+    size: int = 0
+
+
+async def _begin_part(headers: dict[bytes, bytes], directory: str) -> _FormPart:
+    _, disposition = parse_options_header(headers.get(b"content-disposition", b""))
+    name = disposition.get(b"name", b"").decode("utf-8", "replace")
+    filename = disposition.get(b"filename")
+    if filename is None:
+        return _FormPart(name=name, filename=None, value=bytearray())
+    # Байты файла пишутся сразу во временный файл, как в stage_stream
+    temp_path, f = await fs.run("open", _open_temp, directory)
+    return _FormPart(name=name, filename=filename.decode("utf-8", "replace"), file=f, temp_path=temp_path,
+                     hasher=hashlib.sha256())
+
+
+class _MultipartEvents:
+    """python-multipart callbacks that only record events; writing them out is async and done by the caller."""
+
+    def __init__(self):
+        self.events: list[tuple[str, object]] = []
+        self._headers: dict[bytes, bytes] = {}
+        self._field = self._value = b""
+
+    def callbacks(self) -> dict:
+        return {"on_part_begin": self._headers.clear,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": lambda: self.events.append(("begin", dict(self._headers))),
+                "on_part_data": lambda data, start, end: self.events.append(("data", data[start:end])),
+                "on_part_end": lambda: self.events.append(("end", None))}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._field.lower()] = self._value
+        self._field = self._value = b""
+
+
+async def stage_multipart(request: Request,
+                          directory: str = UPLOAD_FOLDER,
+                          max_size: int = MAX_UPLOAD_SIZE,
+                          max_field_size: int = MAX_FORM_FIELD_SIZE) -> StagedForm:
+    """Parse a multipart/form-data body straight from the request stream.
+
+    File parts are written to temp files and hashed as their bytes arrive, so every upload
+    is written once; reading stops with 413 as soon as the body passes ``max_size``,
+    whether or not the client sent Content-Length. Text fields are kept in memory.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected multipart/form-data")
+    recorder = _MultipartEvents()
+    parser = MultipartParser(boundary, recorder.callbacks())
+    form = StagedForm(fields={}, files=[])
+    part: _FormPart | None = None
+    received = 0
+    try:
+        async for body in request.stream():
+            received += len(body)
+            if received > max_size:
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                    detail="File is too large")
+            try:
+                parser.write(body)
+            except MultipartParseError:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed multipart body")
+            for event, value in recorder.events:
+                if event == "begin":
+                    part = await _begin_part(value, directory)
+                elif part.filename is None:
+                    if event == "data":
+                        part.value.extend(value)
+                        if len(part.value) > max_field_size:
+                            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                                detail=f"Form field {part.name!r} is too large")
+                    else:
+                        form.fields[part.name] = part.value.decode("utf-8", "replace")
+                        part = None
+                elif event == "data":
+                    part.size += len(value)
+                    await fs.run("write", _write_chunk, part.file, part.hasher, value)
+                else:
+                    await fs.run("fsync", _finish, part.file)
+                    form.files.append((part.name, part.filename, StagedUpload(
+                        temp_path=part.temp_path, size=part.size, content_hash=part.hasher.hexdigest())))
+                    part = None
+            recorder.events.clear()
+        if part is not None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Incomplete multipart body")
+    except BaseException:
+        if part is not None and part.file is not None:
+            await fs.run("remove", _discard, part.file, part.temp_path)
+        await form.discard()
+        raise
+    return form
+
+
+class RequestSizeLimitMiddleware:
+    """Reject requests whose Content-Length exceeds ``max_size`` before the body is read.
+
+    Pure ASGI: response messages pass through untouched, so ``http.response.pathsend`` and
+    ``http.response.zerocopysend`` still reach the server. Bodies without Content-Length
+    are limited while they are parsed (``stage_multipart``, ``stage_stream``).
+    """
+
+    def __init__(self, app: ASGIApp, max_size: int = MAX_UPLOAD_SIZE):
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"content-length" and value.isdigit() and int(value) > self.max_size:
+                    response = JSONResponse(status_code=413, content={"detail": "File is too large"})
+                    await response(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
+
+
+async def commit_upload(staged: StagedUpload, file_path: str) -> None:
+    await fs.rename(staged.temp_path, file_path)
+
+
+async def discard_upload(staged: StagedUpload) -> None:
+    await fs.remove(staged.temp_path, missing_ok=True)
+
+
+# Resumable uploads: every chunk lives in its own file until the session is completed
+
+def session_dir(session_id: str) -> str:
+    return os.path.join(SESSIONS_FOLDER, session_id)
+
+
+def chunk_path(session_id: str, chunk_index: int) -> str:
+    return os.path.join(session_dir(session_id), f"{chunk_index:08d}.part")
+
+
+def expected_chunk_size(session: UploadSession, chunk_index: int) -> int:
+    if chunk_index < session.total_chunks - 1:
+        return session.chunk_size
+    return session.total_size - session.chunk_size * (session.total_chunks - 1)
+
+
+async def stage_chunk(session: UploadSession, chunk_index: int, chunks: AsyncIterator[bytes]) -> StagedUpload:
+    """Stage one chunk of a session under a private name, so parallel retries never clash."""
+    return await stage_stream(chunks, session_dir(session.id),
+                              max_size=expected_chunk_size(session, chunk_index),
+                              name=f".{chunk_index:08d}-{uuid.uuid4().hex}.part")
+
+
+def _assemble(session_id: str, total_chunks: int, directory: str) -> StagedUpload:
+    temp_path, f = _open_temp(directory)
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        for chunk_index in range(total_chunks):
+            with open(chunk_path(session_id, chunk_index), "rb") as part:
+                while block := part.read(UPLOAD_CHUNK_SIZE):
+                    _write_chunk(f, hasher, block)
+                    size += len(block)
+        _finish(f)
+    except BaseException:
+        _discard(f, temp_path)
+        raise
+    return StagedUpload(temp_path=temp_path, size=size, content_hash=hasher.hexdigest())
+
+
+async def assemble_session(session: UploadSession, directory: str = UPLOAD_FOLDER) -> StagedUpload:
+    """Concatenate the chunks of a session in index order into a temp file."""
+    return await fs.run("assemble", _assemble, session.id, session.total_chunks, directory)
+
+
+async def remove_session_dir(session_id: str) -> None:
+    await fs.rmtree(session_dir(session_id))
+
+
+async def gc_upload_sessions(ttl_seconds: int = UPLOAD_SESSION_TTL_SECONDS) -> int:
+    """Drop sessions that have not received a chunk within the TTL, together with their chunks."""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=ttl_seconds)
+    async with SessionLocal() as db:
+        result = await db.execute(select(UploadSession.id).where(UploadSession.updated_at < cutoff))
+        session_ids = result.scalars().all()
+        if not session_ids:
+            return 0
+        await db.execute(delete(UploadChunk).where(UploadChunk.session_id.in_(session_ids)))
+        await db.execute(delete(UploadSession).where(UploadSession.id.in_(session_ids)))
+        await db.commit()
+    for session_id in session_ids:
+        await remove_session_dir(session_id)
+    logger.info("Removed %d abandoned upload sessions", len(session_ids))
+    return len(session_ids)
+
+
+async def _gc_loop(interval: int) -> None:
+    while True:
+        try:
+            await gc_upload_sessions()
+        except Exception:
+            logger.exception("Upload session garbage collection failed")
+        await asyncio.sleep(interval)
+
+
+_gc_task: asyncio.Task | None = None
+
+
+async def start_upload_gc() -> None:
+    global _gc_task
+    _gc_task = asyncio.create_task(_gc_loop(UPLOAD_SESSION_GC_INTERVAL_SECONDS))
+
+
+async def stop_upload_gc() -> None:
+    global _gc_task
+    if _gc_task is not None:
+        _gc_task.cancel()
+        try:
+            await _gc_task
+        except asyncio.CancelledError:
+            pass
+        _gc_task = None
@@ -0,0 +1,73 @@
+"""Bytes on the wire and CPU per download of a text file, with and without compression.
+
+    python benchmarks/compression.py --rows 200000 --requests 50
+
+Three ways of serving the same CSV are compared in-process:
+identity (what every client got before), gzip computed per request (what a
+compressing middleware would do) and the precompressed variant created by
+the post-upload job.
+"""
+import argparse
+import gzip
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(client, headers: dict, requests: int, recompress: bool = False) -> dict:
+    wire_bytes = 0
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    for _ in range(requests):
+        with client.stream("GET", "/download/1", headers=headers) as response:
+            body = b"".join(response.iter_raw())
+        if recompress:
+            body = gzip.compress(body, compresslevel=6)
+        wire_bytes += len(body)
+    return {"bytes_per_request": wire_bytes // requests,
+            "cpu_ms_per_request": round((time.process_time() - cpu_started) * 1000 / requests, 3),
+            "wall_ms_per_request": round((time.perf_counter() - wall_started) * 1000 / requests, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000, help="CSV rows in the test file")
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        from fastapi.testclient import TestClient
+
+        from app.main import app
+
+        csv = "\n".join(f"{i},user{i % 977},{i * 31 % 10007},2024-11-{i % 28 + 1:02d}" for i in range(args.rows))
+        with TestClient(app) as client:
+            client.post("/register", data={"username": "bench", "password": "bench"})
+            db = sqlite3.connect("test.db")
+            db.execute("UPDATE users SET is_admin = 1 WHERE username = 'bench'")
+            db.commit()
+            db.close()
+            client.post("/login", data={"username": "bench", "password": "bench"})
+            client.post("/upload", files={"uploaded_file": ("report.csv", csv.encode())})
+            # Вариант создаёт фоновая задача после ответа на загрузку
+            while client.get("/files?format=json").json()["items"][0]["status"] == "processing":
+                time.sleep(0.05)
+
+            results = {
+                "identity": measure(client, {"accept-encoding": "identity"}, args.requests),
+                "gzip per request": measure(client, {"accept-encoding": "identity"}, args.requests, recompress=True),
+                "precompressed": measure(client, {"accept-encoding": "gzip"}, args.requests),
+            }
+
+    print(f"{'mode':<18} {'bytes/req':>11} {'cpu ms/req':>11} {'wall ms/req':>12}")
+    for mode, r in results.items():
+        print(f"{mode:<18} {r['bytes_per_request']:>11} {r['cpu_ms_per_request']:>11} {r['wall_ms_per_request']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Check that downloads reach the server as pathsend/zerocopysend when the server offers them.
+
+    python benchmarks/download_extensions.py
+
+The app is driven in-process with raw ASGI requests whose scope carries
+``http.response.pathsend`` or ``http.response.zerocopysend``, the way servers
+that support them call it. Every middleware has to pass those messages through
+untouched; the script exits non-zero when a request fails or a download that
+could use the extension comes back as ordinary ``http.response.body`` messages.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATHSEND = "http.response.pathsend"
+ZEROCOPY = "http.response.zerocopysend"
+
+
+def asgi_request(app, path: str, headers: dict, extensions: dict, method: str = "GET"):
+    """Run one request against the ASGI app; returns the messages it sent, or the exception it raised."""
+
+    async def run():
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+                 "method": method, "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+                 "root_path": "", "server": ("testserver", 80), "client": ("127.0.0.1", 50000),
+                 "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+                 "extensions": extensions}
+        try:
+            await app(scope, receive, send)
+        except Exception as exc:
+            return exc
+        return sent
+
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=256 * 1024, help="bytes in the downloaded file")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        from fastapi.testclient import TestClient
+
+        from app.main import app
+
+        failures = []
+        with TestClient(app) as client:
+            client.post("/register", data={"username": "admin", "password": "admin"})
+            db = sqlite3.connect("test.db")
+            db.execute("UPDATE users SET is_admin = 1 WHERE username = 'admin'")
+            db.commit()
+            db.close()
+            client.post("/login", data={"username": "admin", "password": "admin"})
+            client.post("/upload", files={"uploaded_file": ("blob.bin", os.urandom(args.size))})
+            cookie = f"access_token={client.cookies['access_token']}"
+
+            cases = [
+                ("GET /download/1", "/download/1", {}, {PATHSEND: {}}, 200, PATHSEND),
+                ("GET /download/1", "/download/1", {}, {ZEROCOPY: {}}, 200, ZEROCOPY),
+                ("GET /download/1 Range", "/download/1", {"range": "bytes=0-9"}, {ZEROCOPY: {}}, 206, ZEROCOPY),
+                ("GET /download/1 Range", "/download/1", {"range": "bytes=0-9"}, {PATHSEND: {}}, 206, None),
+                ("GET /static/styles.css", "/static/styles.css", {}, {PATHSEND: {}}, 200, PATHSEND),
+                ("GET /static/styles.css", "/static/styles.css", {}, {ZEROCOPY: {}}, 200, ZEROCOPY),
+            ]
+            print(f"{'request':<24} {'extension':<28} {'status':>6}  messages")
+            for name, path, headers, extensions, expected_status, expected_message in cases:
+                sent = client.portal.call(asgi_request(app, path, {"cookie": cookie, **headers}, extensions))
+                extension = next(iter(extensions))
+                if isinstance(sent, Exception):
+                    print(f"{name:<24} {extension:<28} {'-':>6}  {type(sent).__name__}: {sent}")
+                    failures.append(f"{name} with {extension} raised {type(sent).__name__}")
+                    continue
+                types = [message["type"] for message in sent]
+                status = sent[0].get("status") if sent else None
+                print(f"{name:<24} {extension:<28} {status!s:>6}  {', '.join(types)}")
+                if status != expected_status:
+                    failures.append(f"{name} with {extension} answered {status}, expected {expected_status}")
+                elif expected_message and expected_message not in types:
+                    failures.append(f"{name} with {extension} did not use {expected_message}")
+
+            response = client.post("/upload", content=b"", headers={"content-length": str(2 ** 62)})
+            if response.status_code != 413:
+                failures.append(f"oversized Content-Length answered {response.status_code}, expected 413")
+        os.chdir(ROOT)
+
+    for failure in failures:
+        print("FAIL:", failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Latency of an unrelated endpoint while many users log in at once.
+
+    python benchmarks/login_storm.py --logins 32 --readers 8 --duration 5
+
+The public listing is measured twice in-process: alone, and while
+``--logins`` clients hammer POST /login. With bcrypt on the event loop the
+second p99 is dominated by hash time; with the worker pool it stays close
+to the first.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)] * 1000 if values else 0.0
+
+
+async def seed() -> None:
+    from app.database import SessionLocal, engine, Base
+    from app.dependencies import get_password_hash
+    from app.models import User, File
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as db:
+        user = User(username="storm", password=await get_password_hash("storm"))
+        db.add(user)
+        await db.flush()
+        db.add_all([File(filename=f"file{i}", path="", access_granted=True, upload_count=0, owner_id=user.id)
+                    for i in range(100)])
+        await db.commit()
+
+
+async def phase(transport, cookies: dict, readers: int, logins: int, duration: float) -> dict:
+    import httpx
+
+    deadline = time.perf_counter() + duration
+    read_latencies, login_latencies = [], []
+
+    async def reader():
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", cookies=cookies) as client:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await client.get("/files/users?format=json&limit=20")
+                read_latencies.append(time.perf_counter() - started)
+
+    async def login():
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await client.post("/login", data={"username": "storm", "password": "storm"})
+                login_latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*[reader() for _ in range(readers)], *[login() for _ in range(logins)])
+    return {"reads": len(read_latencies),
+            "read_p50_ms": round(percentile(read_latencies, 0.5), 2),
+            "read_p99_ms": round(percentile(read_latencies, 0.99), 2),
+            "logins": len(login_latencies),
+            "login_p99_ms": round(percentile(login_latencies, 0.99), 2)}
+
+
+async def run(args) -> None:
+    import httpx
+
+    from app.main import app
+
+    await seed()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.post("/login", data={"username": "storm", "password": "storm"})
+            cookies = dict(client.cookies)
+        quiet = await phase(transport, cookies, args.readers, 0, args.duration)
+        storm = await phase(transport, cookies, args.readers, args.logins, args.duration)
+    print(f"{'phase':<7} {'reads':>7} {'p50 ms':>8} {'p99 ms':>8} {'logins':>7} {'login p99':>10}")
+    for name, r in (("quiet", quiet), ("storm", storm)):
+        print(f"{name:<7} {r['reads']:>7} {r['read_p50_ms']:>8} {r['read_p99_ms']:>8} "
+              f"{r['logins']:>7} {r['login_p99_ms']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+    sys.path.insert(0, ROOT)
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Cost of the metrics middleware and SQL hooks per request.
+
+    python benchmarks/metrics_overhead.py --requests 200 --rounds 10 --max-overhead 5
+
+Two measurements:
+
+* micro  - the bare ASGI middleware around a no-op app, in microseconds per call;
+* app    - real endpoints driven in-process, alternating between the bare app
+           and the same app with the middleware and SQL hooks on, for
+           ``--rounds`` rounds; the median per-request time of each is kept,
+           so drift on a noisy machine hits both sides equally.
+
+Exits non-zero when any endpoint gets more than ``--max-overhead`` percent slower.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINTS = ["/files/users?format=json", "/files/users?format=json&prefix=f&limit=5", "/download/1", "/profile"]
+
+
+async def micro(calls: int) -> dict:
+    from app.utils.instrumentation import MetricsMiddleware
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-length", b"2")]})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    results = {}
+    for name, target in (("bare", app), ("instrumented", MetricsMiddleware(app))):
+        scope = {"type": "http", "method": "GET", "path": "/", "headers": []}
+        started = time.perf_counter()
+        for _ in range(calls):
+            await target(dict(scope), receive, send)
+        results[name] = (time.perf_counter() - started) / calls * 1e6
+    return results
+
+
+async def seed(client) -> None:
+    from app.database import engine
+
+    await client.post("/register", data={"username": "bench", "password": "bench"})
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("UPDATE users SET is_admin = 1 WHERE username = 'bench'")
+    await client.post("/login", data={"username": "bench", "password": "bench"})
+    for i in range(50):
+        await client.post("/upload", files={"uploaded_file": (f"f{i}.bin", os.urandom(4096))})
+    await client.put("/files/batch/access", json={"filter": {"prefix": "f"}, "access_granted": True})
+
+
+async def compare(args) -> dict:
+    import httpx
+
+    from app.database import engine
+    from app.main import app
+    from app.utils.instrumentation import MetricsMiddleware, instrument_engine, uninstrument_engine
+    from app.utils.page_cache import page_cache
+
+    samples = {endpoint: {"off": [], "on": []} for endpoint in ENDPOINTS}
+    async with app.router.lifespan_context(app):
+        clients = {"off": httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench"),
+                   "on": httpx.AsyncClient(transport=httpx.ASGITransport(app=MetricsMiddleware(app)),
+                                           base_url="http://bench")}
+        await seed(clients["off"])
+        clients["on"].cookies = clients["off"].cookies
+        for round_ in range(args.rounds):
+            # Порядок меняется каждый раунд, чтобы ни одна сторона не шла всегда первой
+            for mode in ("off", "on") if round_ % 2 == 0 else ("on", "off"):
+                client = clients[mode]
+                if mode == "on":
+                    instrument_engine(engine)
+                for endpoint in ENDPOINTS:
+                    started = time.perf_counter()
+                    for i in range(args.requests):
+                        if i % 2:
+                            page_cache.bump()  # половина запросов мимо кэша страниц, с реальными SQL
+                        await client.get(endpoint)
+                    samples[endpoint][mode].append((time.perf_counter() - started) / args.requests * 1e6)
+                if mode == "on":
+                    uninstrument_engine(engine)
+        for client in clients.values():
+            await client.aclose()
+    return {endpoint: {mode: statistics.median(values) for mode, values in modes.items()}
+            for endpoint, modes in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and round")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--calls", type=int, default=100_000, help="calls for the micro benchmark")
+    parser.add_argument("--max-overhead", type=float, default=5.0, help="allowed slowdown in percent")
+    args = parser.parse_args()
+
+    # Приложение без метрик; включаем их вручную, попеременно с выключенными
+    os.environ["METRICS_ENABLED"] = "false"
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    sys.path.insert(0, ROOT)
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        m = asyncio.run(micro(args.calls))
+        results = asyncio.run(compare(args))
+        os.chdir(ROOT)
+
+    print(f"micro: bare {m['bare']:.2f} us/call, instrumented {m['instrumented']:.2f} us/call "
+          f"(+{m['instrumented'] - m['bare']:.2f} us)")
+    failed = False
+    print(f"{'endpoint':<44} {'off us':>9} {'on us':>9} {'overhead':>9}")
+    for endpoint, r in results.items():
+        overhead = (r["on"] - r["off"]) / r["off"] * 100
+        failed |= overhead > args.max_overhead
+        print(f"{endpoint:<44} {r['off']:>9.1f} {r['on']:>9.1f} {overhead:>8.1f}%")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
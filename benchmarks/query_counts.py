@@ -0,0 +1,127 @@
+"""SQL statement count per endpoint, checked against a fixed budget.
+
+    python benchmarks/query_counts.py --files 10 500 --users 3 50
+
+The app is driven in-process against a fresh SQLite database for every
+(files, users) combination. The script exits non-zero when an endpoint
+issues more statements than its budget or when the count grows with the
+size of the data, which is how N+1 and over-fetch regressions show up.
+Only statements issued while handling the request are counted; background
+loops such as the job queue poller share the engine but not the request.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Statements per request with warm auth caches and a cold page cache
+BUDGETS = {
+    "GET /files": 1,
+    "GET /files/users": 1,
+    "GET /profile": 0,
+    "GET /download/1": 1,
+}
+
+
+def seed(db_path: str, n_files: int, n_users: int) -> None:
+    db = sqlite3.connect(db_path)
+    db.executemany("INSERT INTO users (username, password, is_admin) VALUES (?, '', 0)",
+                   [(f"user{i}",) for i in range(n_users)])
+    owners = [row[0] for row in db.execute("SELECT id FROM users")]
+    db.executemany(
+        "INSERT INTO files (filename, path, upload_count, access_granted, owner_id) VALUES (?, ?, 0, ?, ?)",
+        [(f"seed{i}.txt", os.path.join("app/media/uploads", f"seed{i}.txt"), i % 2, owners[i % len(owners)])
+         for i in range(n_files)],
+    )
+    db.commit()
+    db.close()
+
+
+def measure(n_files: int, n_users: int) -> dict:
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    from app.database import engine
+    from app.main import app
+    from app.utils.instrumentation import _request_db
+    from app.utils.page_cache import page_cache
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        # Только SQL самого HTTP-запроса: опрос очереди задач и другие фоновые циклы идут через тот же engine
+        if _request_db.get() is not None:
+            statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        with TestClient(app) as client:
+            client.post("/register", data={"username": "admin", "password": "admin"})
+            db = sqlite3.connect("test.db")
+            db.execute("UPDATE users SET is_admin = 1 WHERE username = 'admin'")
+            db.commit()
+            db.close()
+            client.post("/login", data={"username": "admin", "password": "admin"})
+            client.post("/upload", files={"uploaded_file": ("first.txt", b"query count")})
+            seed("test.db", n_files, n_users)
+
+            counts = {}
+            for name in BUDGETS:
+                method, url = name.split(" ")
+                client.request(method, url)  # прогрев кэшей
+                page_cache.bump()  # отрендеренные страницы не в счёт: меряем сами запросы
+                statements.clear()
+                response = client.request(method, url)
+                assert response.status_code == 200, (name, response.status_code)
+                counts[name] = len(statements)
+        return counts
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+        # Соединения пула привязаны к текущей базе и event loop
+        asyncio.run(engine.dispose())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, nargs="+", default=[10, 500])
+    parser.add_argument("--users", type=int, nargs="+", default=[3, 50])
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    # Контекст запроса (_request_db) выставляет MetricsMiddleware
+    os.environ["METRICS_ENABLED"] = "true"
+    failures = []
+    results = {}
+    # Путь к базе фиксируется при создании engine, поэтому каталог один на все прогоны
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    for n_files, n_users in itertools.product(args.files, args.users):
+        for entry in os.listdir(workdir):
+            path = os.path.join(workdir, entry)
+            shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+        results[(n_files, n_users)] = counts = measure(n_files, n_users)
+        print(f"files={n_files:<6} users={n_users:<5} " + "  ".join(f"{k}: {v}" for k, v in counts.items()))
+        for name, n in counts.items():
+            if n > BUDGETS[name]:
+                failures.append(f"{name} issued {n} statements (budget {BUDGETS[name]}) "
+                                f"with {n_files} files / {n_users} users")
+
+    for name in BUDGETS:
+        if len({counts[name] for counts in results.values()}) > 1:
+            failures.append(f"{name} statement count depends on data size")
+
+    os.chdir(ROOT)
+    shutil.rmtree(workdir, ignore_errors=True)
+    for failure in failures:
+        print("FAIL:", failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
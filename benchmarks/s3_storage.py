@@ -0,0 +1,134 @@
+"""Check S3Storage end to end against an in-memory stand-in for the S3 client.
+
+    python benchmarks/s3_storage.py
+
+``FakeS3Client`` implements the four boto3 calls the backend uses
+(``head_object``, ``upload_file``, ``delete_object``, ``generate_presigned_url``)
+over a dict and records every call. The app is driven in-process with that
+backend: two uploads of the same content, downloads, and deletes. The script
+exits non-zero when dedup, the download redirect, the post-upload job or the
+blob removal after the last reference behaves differently from local storage.
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUCKET = "files"
+
+
+class ClientError(Exception):
+    """Shaped like botocore's ClientError: the error code is in ``response``."""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class FakeS3Client:
+    def __init__(self):
+        self.objects: dict[tuple[str, str], bytes] = {}
+        self.calls: Counter[str] = Counter()
+
+    def head_object(self, Bucket: str, Key: str) -> dict:
+        self.calls["head_object"] += 1
+        if (Bucket, Key) not in self.objects:
+            raise ClientError("404")
+        return {"ContentLength": len(self.objects[Bucket, Key])}
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str) -> None:
+        self.calls["upload_file"] += 1
+        with open(Filename, "rb") as f:
+            self.objects[Bucket, Key] = f.read()
+
+    def delete_object(self, Bucket: str, Key: str) -> dict:
+        self.calls["delete_object"] += 1
+        self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def generate_presigned_url(self, operation: str, Params: dict, ExpiresIn: int) -> str:
+        self.calls["generate_presigned_url"] += 1
+        disposition = Params["ResponseContentDisposition"]
+        return (f"https://s3.test/{Params['Bucket']}/{Params['Key']}?op={operation}&expires={ExpiresIn}"
+                f"&disposition={disposition}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=64 * 1024, help="bytes per uploaded file")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    failures = []
+
+    def check(condition: bool, message: str) -> None:
+        print(("ok    " if condition else "FAIL  ") + message)
+        if not condition:
+            failures.append(message)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        from fastapi.testclient import TestClient
+
+        from app.main import app
+        from app.routes import files
+        from app.utils.storage import S3Storage, blob_key
+
+        client_s3 = FakeS3Client()
+        # Маршруты берут хранилище из своего модуля: подменяем его там
+        files.storage = S3Storage(BUCKET, prefix="blobs/", client=client_s3)
+        content = os.urandom(args.size)
+        key = "blobs/" + blob_key(hashlib.sha256(content).hexdigest())
+
+        with TestClient(app) as client:
+            client.post("/register", data={"username": "admin", "password": "admin"})
+            db = sqlite3.connect("test.db")
+            db.execute("UPDATE users SET is_admin = 1 WHERE username = 'admin'")
+            db.commit()
+            client.post("/login", data={"username": "admin", "password": "admin"})
+
+            for name in ("a.bin", "b.bin"):
+                response = client.post("/upload", files={"uploaded_file": (name, content)}, follow_redirects=False)
+                check(response.status_code == 302, f"upload {name} answered {response.status_code}")
+            check(client_s3.calls["upload_file"] == 1, f"identical content uploaded once "
+                                                       f"({client_s3.calls['upload_file']} upload_file calls)")
+            check(client_s3.objects.get((BUCKET, key)) == content, "blob stored under its content hash")
+            rows = db.execute("SELECT id, path FROM files ORDER BY id").fetchall()
+            check(all(path == f"s3://{BUCKET}/{key}" for _, path in rows), "File.path points at the bucket key")
+            check(not [f for f in os.listdir("app/media/uploads") if f.startswith(".upload")],
+                  "staged temp files removed")
+
+            for _ in range(50):
+                statuses = {status for status, in db.execute("SELECT status FROM files")}
+                if "processing" not in statuses:
+                    break
+                time.sleep(0.1)
+            check(statuses == {"ready"}, f"post-upload job finished ({statuses})")
+
+            response = client.get(f"/download/{rows[0][0]}", follow_redirects=False)
+            location = urlparse(response.headers.get("location", ""))
+            check(response.status_code == 302 and location.path == f"/{BUCKET}/{key}",
+                  f"download redirects to a presigned URL ({response.status_code})")
+            check("a.bin" in parse_qs(location.query).get("disposition", [""])[0],
+                  "presigned URL keeps the download filename")
+
+            client.delete(f"/delete/{rows[0][0]}")
+            check((BUCKET, key) in client_s3.objects, "blob kept while another file references it")
+            client.delete(f"/delete/{rows[1][0]}")
+            check((BUCKET, key) not in client_s3.objects and client_s3.calls["delete_object"] == 1,
+                  "blob deleted with its last reference")
+            db.close()
+        os.chdir(ROOT)
+
+    print(dict(client_s3.calls))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
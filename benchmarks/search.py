@@ -0,0 +1,90 @@
+"""Latency of GET /files/search against a full-table LIKE scan, on a large SQLite database.
+
+    python benchmarks/search.py --files 1000000 --requests 20
+
+Files get names built from a fixed word list (``--seed``), a few owners, and
+tags on every tenth file; the search index is filled by its triggers as the
+rows go in. Each query is run through the endpoint (page cache bumped before
+every request, so nothing is served from memory) and, for comparison, as the
+``LIKE '%term%'`` query the listing would need without the index. Queries
+with more than ``SEARCH_RANK_LIMIT`` matches come back unranked, in id order.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORDS = ["report", "invoice", "holiday", "photos", "backup", "draft", "contract", "budget", "summary", "scan",
+         "quarterly", "annual", "meeting", "notes", "design", "release", "archive", "export", "payroll", "audit"]
+QUERIES = {"common": "budget", "rare": "0012345", "two words": "annual invoice", "typo": "budgte-audti",
+           "owner": "owner3", "prefix hit": "budget-a", "prefix miss": "ab"}
+
+
+def seed(files: int, rng: random.Random) -> None:
+    db = sqlite3.connect("test.db")
+    db.executemany("INSERT INTO users (username, password, is_admin) VALUES (?, '', 1)",
+                   [(f"owner{i}",) for i in range(10)])
+    rows = ((f"{rng.choice(WORDS)}-{rng.choice(WORDS)}-{i:07d}.{rng.choice(['pdf', 'csv', 'zip'])}",
+             "", True, 1 + i % 10, "ready", ",".join(rng.sample(WORDS, 2)) if i % 10 == 0 else None)
+            for i in range(files))
+    db.executemany("INSERT INTO files (filename, path, access_granted, owner_id, status, tags) "
+                   "VALUES (?, ?, ?, ?, ?, ?)", rows)
+    # После массовой загрузки без статистики планировщик выбирает индекс access_granted вместо filename
+    db.execute("ANALYZE")
+    db.commit()
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        import asyncio
+
+        from fastapi.testclient import TestClient
+
+        from app.database import engine
+        from app.main import app, init_db
+        from app.utils.page_cache import page_cache
+
+        asyncio.run(init_db())
+        asyncio.run(engine.dispose())
+        started = time.perf_counter()
+        seed(args.files, random.Random(args.seed))
+        print(f"seeded {args.files} files with triggers in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        with TestClient(app) as client:
+            db = sqlite3.connect("test.db")
+
+            print(f"{'query':<12} {'mode':<7} {'ranked':<6} {'hits':>5} {'search p50 ms':>14} {'LIKE scan p50 ms':>17}")
+            for name, q in QUERIES.items():
+                search, scan = [], []
+                for _ in range(args.requests):
+                    page_cache.bump()
+                    started = time.perf_counter()
+                    body = client.get("/files/search", params={"q": q}).json()
+                    search.append(time.perf_counter() - started)
+                    started = time.perf_counter()
+                    db.execute("SELECT files.id FROM files LEFT JOIN users ON users.id = files.owner_id "
+                               "WHERE files.filename LIKE ? OR users.username LIKE ? OR files.tags LIKE ? "
+                               "ORDER BY files.id LIMIT 50", (f"%{q}%",) * 3).fetchall()
+                    scan.append(time.perf_counter() - started)
+                print(f"{name:<12} {body['mode']:<7} {str(body['ranked']):<6} {len(body['items']):>5} "
+                      f"{statistics.median(search) * 1000:>14.2f} {statistics.median(scan) * 1000:>17.2f}")
+            db.close()
+        os.chdir(ROOT)
+
+
+if __name__ == "__main__":
+    main()
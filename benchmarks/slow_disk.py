@@ -0,0 +1,132 @@
+"""Latency of unrelated endpoints while the disk is artificially slow.
+
+    python benchmarks/slow_disk.py --disk-latency 0.2 --readers 8 --duration 3
+
+Every filesystem call made through ``app.utils.fs`` gets ``--disk-latency``
+seconds of extra sleep while downloads run in parallel with readers of the
+public JSON listing. Three phases are measured in-process, each with the
+same readers and downloaders:
+
+* fast     - no injected latency;
+* pool     - slow disk behind the bounded filesystem pool (the app as is);
+* inline   - the same slow calls made directly on the event loop, as the
+             files router used to do with ``os.remove``.
+
+The run fails (exit code 1) if readers in the ``pool`` phase get a p99 more
+than ``--tolerance`` slower than in the fast phase.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)] * 1000 if values else 0.0
+
+
+def slow_disk(fs, delay: float, inline: bool):
+    """Patch ``fs.run`` so every call sleeps ``delay`` first, in the pool or on the loop."""
+    original = fs.run
+
+    def slowed(fn):
+        def call(*args, **kwargs):
+            time.sleep(delay)
+            return fn(*args, **kwargs)
+        return call
+
+    async def run(operation, fn, *args, **kwargs):
+        if inline:
+            return slowed(fn)(*args, **kwargs)
+        return await original(operation, slowed(fn), *args, **kwargs)
+
+    fs.run = run
+    return lambda: setattr(fs, "run", original)
+
+
+async def phase(transport, cookies: dict, args) -> dict:
+    import httpx
+
+    deadline = time.perf_counter() + args.duration
+    read_latencies, downloads = [], 0
+
+    async def reader():
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", cookies=cookies) as client:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await client.get("/files/users?format=json&limit=20")
+                read_latencies.append(time.perf_counter() - started)
+
+    async def downloader():
+        nonlocal downloads
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", cookies=cookies) as client:
+            while time.perf_counter() < deadline:
+                await client.get("/download/1")
+                downloads += 1
+
+    await asyncio.gather(*[reader() for _ in range(args.readers)], *[downloader() for _ in range(args.disk_clients)])
+    return {"reads": len(read_latencies),
+            "p50_ms": round(percentile(read_latencies, 0.5), 2),
+            "p99_ms": round(percentile(read_latencies, 0.99), 2),
+            "downloads": downloads}
+
+
+async def run(args) -> bool:
+    import httpx
+
+    from app.main import app
+    from app.utils.fs import fs
+    from app.utils.loop_monitor import loop_stall_detector
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.post("/register", data={"username": "bench", "password": "bench"})
+            from app.database import engine
+            async with engine.begin() as conn:
+                await conn.exec_driver_sql("UPDATE users SET is_admin = 1 WHERE username = 'bench'")
+            await client.post("/login", data={"username": "bench", "password": "bench"})
+            await client.post("/upload", files={"uploaded_file": ("bench.bin", os.urandom(64 * 1024))})
+            await client.put("/files/batch/access", json={"ids": [1], "access_granted": True})
+            cookies = dict(client.cookies)
+
+        for name, delay, inline in (("fast", 0.0, False), ("pool", args.disk_latency, False),
+                                    ("inline", args.disk_latency, True)):
+            stalls = loop_stall_detector.stalls
+            restore = slow_disk(fs, delay, inline)
+            try:
+                results[name] = await phase(transport, cookies, args)
+            finally:
+                restore()
+            results[name]["loop_stalls"] = loop_stall_detector.stalls - stalls
+
+    print(f"{'phase':<7} {'reads':>7} {'p50 ms':>8} {'p99 ms':>8} {'downloads':>10} {'stalls':>7}")
+    for name, r in results.items():
+        print(f"{name:<7} {r['reads']:>7} {r['p50_ms']:>8} {r['p99_ms']:>8} {r['downloads']:>10} {r['loop_stalls']:>7}")
+    ok = results["pool"]["p99_ms"] <= results["fast"]["p99_ms"] + args.tolerance * 1000
+    print("PASS" if ok else "FAIL", f"(pool p99 within {args.tolerance * 1000:.0f} ms of fast p99)")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--disk-latency", type=float, default=0.2, help="seconds added to every filesystem call")
+    parser.add_argument("--disk-clients", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per phase")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="allowed p99 regression in seconds")
+    args = parser.parse_args()
+    sys.path.insert(0, ROOT)
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""Throughput and latency percentiles for the main endpoints, as comparable JSON.
+
+    python benchmarks/suite.py --users 100 --files 10000 --output before.json
+    python benchmarks/suite.py --users 100 --files 10000 --output after.json --compare before.json
+
+A fresh working directory is seeded deterministically (``--seed``) with
+``--users`` users and ``--files`` files, one small and one large blob behind
+them. Every scenario then sends a fixed number of requests from
+``--concurrency`` concurrent clients, first in-process through the ASGI
+transport, then over HTTP against a local uvicorn on the same data.
+
+Scenarios: login, listing (HTML page, JSON page, filtered JSON with varying
+prefixes), download of the small and the large file, upload. The JSON report
+holds rps and p50/p95/p99 per mode and scenario plus the environment it ran
+in; ``--compare`` prints the change against an earlier report.
+"""
+import argparse
+import asyncio
+import datetime
+import hashlib
+import itertools
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "bench-password"
+ADMIN = "bench-admin"
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)] * 1000 if values else 0.0
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def seed(args) -> None:
+    """Users, files and blobs, identical for identical arguments."""
+    from sqlalchemy import insert
+
+    from app.database import SessionLocal, engine, Base
+    from app.dependencies import get_password_hash
+    from app.models import User, File
+    from app.utils.storage import storage
+
+    rng = random.Random(args.seed)
+    blobs = {"small": rng.randbytes(args.small_kb * 1024), "large": rng.randbytes(args.large_mb * 1024 * 1024)}
+    hashes = {}
+    for name, content in blobs.items():
+        hashes[name] = content_hash = hashlib.sha256(content).hexdigest()
+        path = storage.location(content_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    # Один хеш на всех: bcrypt на тысячи пользователей занял бы минуты
+    password = await get_password_hash(PASSWORD)
+    async with SessionLocal() as db:
+        await db.execute(insert(User), [{"username": ADMIN, "password": password, "is_admin": True}] +
+                         [{"username": f"user{i}", "password": password, "is_admin": False}
+                          for i in range(args.users)])
+        rows = []
+        for i in range(args.files):
+            kind = "large" if i == 1 else "small"
+            rows.append({"filename": f"file{i:07d}.bin",
+                         "path": storage.location(hashes[kind]),
+                         "upload_count": rng.randrange(1000),
+                         # Первые два файла всегда доступны: их качают сценарии download_*
+                         "access_granted": i < 2 or rng.random() < 0.75,
+                         "size": len(blobs[kind]),
+                         "content_hash": hashes[kind],
+                         "owner_id": 1 + rng.randrange(args.users + 1)})
+        for i in range(0, len(rows), 5000):
+            await db.execute(insert(File), rows[i:i + 5000])
+        await db.commit()
+    await engine.dispose()
+
+
+def scenarios(args, run_id: str) -> dict:
+    """name -> (client, number of requests, request factory)."""
+    upload_payload = random.Random(args.seed).randbytes(args.upload_kb * 1024)
+    requests = args.requests
+    return {
+        "login": ("anonymous", args.login_requests,
+                  lambda i: ("POST", "/login", {"data": {"username": f"user{i % args.users}", "password": PASSWORD}})),
+        "listing_html": ("user", requests, lambda i: ("GET", "/files/users", {})),
+        "listing_json": ("user", requests, lambda i: ("GET", "/files/users?format=json&limit=50", {})),
+        "listing_filtered": ("user", requests,
+                             lambda i: ("GET", f"/files/users?format=json&prefix=file{i % 1000:04d}", {})),
+        "download_small": ("user", requests, lambda i: ("GET", "/download/1", {})),
+        "download_large": ("user", max(requests // 10, 10), lambda i: ("GET", "/download/2", {})),
+        "upload": ("admin", max(requests // 5, 10),
+                   lambda i: ("POST", "/upload", {"files": {"uploaded_file": (f"upload-{run_id}-{i}.bin",
+                                                                               upload_payload)}})),
+    }
+
+
+async def run_scenario(client, total: int, make_request, concurrency: int) -> dict:
+    import httpx
+
+    latencies, errors = [], 0
+    counter = itertools.count()
+
+    async def worker():
+        nonlocal errors
+        while (i := next(counter)) < total:
+            method, url, kwargs = make_request(i)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                errors += response.status_code >= 400
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {"requests": total,
+            "errors": errors,
+            "rps": round(total / elapsed, 1),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2)}
+
+
+async def drive(args, mode: str, client_options: dict) -> dict:
+    import httpx
+
+    clients = {kind: httpx.AsyncClient(timeout=None, **client_options) for kind in ("anonymous", "user", "admin")}
+    try:
+        await clients["user"].post("/login", data={"username": "user0", "password": PASSWORD})
+        await clients["admin"].post("/login", data={"username": ADMIN, "password": PASSWORD})
+        results = {}
+        for name, (kind, total, make_request) in scenarios(args, mode).items():
+            if args.scenarios and name not in args.scenarios:
+                continue
+            results[name] = await run_scenario(clients[kind], total, make_request, args.concurrency)
+            print(f"{mode:<10} {name:<17} {results[name]['rps']:>8} {results[name]['p50_ms']:>8} "
+                  f"{results[name]['p95_ms']:>8} {results[name]['p99_ms']:>8} {results[name]['errors']:>6}",
+                  file=sys.stderr)
+        return results
+    finally:
+        for client in clients.values():
+            await client.aclose()
+
+
+async def run_inprocess(args) -> dict:
+    import httpx
+
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        return await drive(args, "inprocess", {"transport": httpx.ASGITransport(app=app),
+                                               "base_url": "http://bench"})
+
+
+def run_uvicorn(args, workdir: str) -> dict:
+    import httpx
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--app-dir", ROOT,
+                               "--port", str(port), "--log-level", "warning", "--no-access-log"],
+                              cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                httpx.get(f"{base_url}/login", timeout=1.0)
+                break
+            except httpx.TransportError:
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise RuntimeError("uvicorn did not start")
+                time.sleep(0.1)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        return asyncio.run(drive(args, "uvicorn", {"base_url": base_url, "limits": limits}))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def compare(report: dict, baseline: dict) -> None:
+    print(f"{'mode':<10} {'scenario':<17} {'rps':>16} {'p99 ms':>18}")
+    for mode, results in report["results"].items():
+        for name, r in results.items():
+            old = baseline.get("results", {}).get(mode, {}).get(name)
+            if not old:
+                continue
+            rps_change = (r["rps"] - old["rps"]) / old["rps"] * 100 if old["rps"] else 0.0
+            p99_change = (r["p99_ms"] - old["p99_ms"]) / old["p99_ms"] * 100 if old["p99_ms"] else 0.0
+            print(f"{mode:<10} {name:<17} {old['rps']:>7}->{r['rps']:<7} {rps_change:>+6.1f}% "
+                  f"{old['p99_ms']:>7}->{r['p99_ms']:<7} {p99_change:>+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--files", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--small-kb", type=int, default=16, help="size of the small download")
+    parser.add_argument("--large-mb", type=int, default=32, help="size of the large download")
+    parser.add_argument("--upload-kb", type=int, default=256, help="size of every upload")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--login-requests", type=int, default=50, help="logins are bcrypt-bound, so fewer")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--modes", nargs="+", choices=["inprocess", "uvicorn"], default=["inprocess", "uvicorn"])
+    parser.add_argument("--scenarios", nargs="+", help="run only these scenarios")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    report = {"meta": {"started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                       "git_revision": git_revision(),
+                       "python": platform.python_version(),
+                       "platform": platform.platform(),
+                       "cpus": os.cpu_count(),
+                       "args": vars(args)},
+              "results": {}}
+    sys.path.insert(0, ROOT)
+    print(f"{'mode':<10} {'scenario':<17} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}",
+          file=sys.stderr)
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        asyncio.run(seed(args))
+        if "inprocess" in args.modes:
+            report["results"]["inprocess"] = asyncio.run(run_inprocess(args))
+        if "uvicorn" in args.modes:
+            report["results"]["uvicorn"] = run_uvicorn(args, workdir)
+        os.chdir(ROOT)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
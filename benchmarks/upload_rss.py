@@ -0,0 +1,104 @@
+"""Peak server RSS while uploading files of growing size through POST /upload.
+
+    python benchmarks/upload_rss.py --sizes 16 256 1024
+
+Every size runs against a fresh uvicorn process in a temporary working
+directory, so the reported VmHWM belongs to that single upload.
+"""
+import argparse
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def peak_rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    return 0
+
+
+def wait_ready(base_url: str, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{base_url}/login", timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def make_file(path: str, size_mb: int) -> None:
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(block)
+
+
+def run_one(size_mb: int) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--app-dir", ROOT,
+             "--port", str(port), "--log-level", "warning"],
+            cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_ready(base_url)
+            with httpx.Client(base_url=base_url, timeout=None) as client:
+                client.post("/register", data={"username": "bench", "password": "bench"})
+                db = sqlite3.connect(os.path.join(workdir, "test.db"))
+                db.execute("UPDATE users SET is_admin = 1 WHERE username = 'bench'")
+                db.commit()
+                db.close()
+                client.post("/login", data={"username": "bench", "password": "bench"})
+
+                baseline = peak_rss_kb(server.pid)
+                payload = os.path.join(workdir, "payload.bin")
+                make_file(payload, size_mb)
+                started = time.perf_counter()
+                with open(payload, "rb") as f:
+                    response = client.post("/upload", files={"uploaded_file": ("payload.bin", f)})
+                elapsed = time.perf_counter() - started
+                return {
+                    "size_mb": size_mb,
+                    "status": response.status_code,
+                    "seconds": round(elapsed, 3),
+                    "baseline_rss_mb": round(baseline / 1024, 1),
+                    "peak_rss_mb": round(peak_rss_kb(server.pid) / 1024, 1),
+                }
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16, 128, 512], help="file sizes in MiB")
+    args = parser.parse_args()
+    print(f"{'size MiB':>9} {'status':>6} {'seconds':>8} {'base RSS':>9} {'peak RSS':>9}")
+    for size_mb in args.sizes:
+        r = run_one(size_mb)
+        print(f"{r['size_mb']:>9} {r['status']:>6} {r['seconds']:>8} "
+              f"{r['baseline_rss_mb']:>9} {r['peak_rss_mb']:>9}")
+
+
+if __name__ == "__main__":
+    main()